@@ -0,0 +1,3 @@
+Add ``WidgetsViewBatch`` to set up and render display widgets for many objects
+with the same schemata. It computes the layout once and looks up the widget
+factory of each field only once.
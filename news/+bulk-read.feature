@@ -0,0 +1,3 @@
+Add ``plone.autoform.supermodel.bulkRead()``. Within it, the ``form`` and
+``security`` supermodel handlers collect their values and set the tagged
+values once per schema instead of once per field.
@@ -0,0 +1,3 @@
+Store omitted, mode and order hints as ``FieldHint`` and ``OrderHint`` tuples
+with interned field names and values, and give ``ParameterizedWidget``
+``__slots__``, which reduces the memory used by sites with many schemata.
@@ -0,0 +1,4 @@
+Add ``WidgetsView.displayValues()``, which returns ``(fieldset, field, label,
+value)`` records for the fields of a view, with translated labels and values
+converted like their display widgets would, without updating or rendering any
+widgets, for listings which show many items.
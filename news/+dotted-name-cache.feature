@@ -0,0 +1,4 @@
+``resolveDottedName`` uses a thread safe ``DottedNameCache``, which can be
+bounded, remembers names which cannot be resolved for a while, and reports
+hit/miss statistics. Call ``plone.autoform.utils._dottedCache.clear()`` to
+reset it.
@@ -0,0 +1,2 @@
+Cache the widget export/import handlers per widget and field type, and read
+widget parameters from model XML in a single pass over the child nodes.
@@ -0,0 +1,7 @@
+Apply field moves from ``ORDER_KEY`` rules in a single pass over the rules and
+linear time in the number of fields, instead of moving fields one by one
+through ``plone.z3cform``. Moves that cannot be applied are available as
+``fieldMoveProblems`` on the form.
+The rule tree methods of ``AutoFields`` (``_calculate_field_moves``,
+``_cleanup_rules`` and ``_process_field_moves``) are deprecated and will be
+removed in 4.0. Forms which override one of them still use the rule tree.
@@ -0,0 +1,2 @@
+``processFields`` builds the z3c.form fields of a schema once and copies only
+the fields which end up in the form. Omitted fields are filtered in one pass.
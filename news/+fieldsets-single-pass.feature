@@ -0,0 +1,3 @@
+Sort the fields of a schema into fieldsets in a single pass, and look up
+groups by name when ``autoGroups`` is set, so that forms with many fieldsets
+and additional schemata are set up in linear time.
@@ -0,0 +1,3 @@
+Add ``schemaGeneration()`` and ``combinedGeneration()``: cheap stamps which
+change whenever plone.autoform changes the form hints of a schema, or its form
+hint tagged values are replaced. Caches can compare them on every request.
@@ -0,0 +1,3 @@
+Exporting a model with the ``form`` and ``security`` supermodel handlers
+indexes the tagged values of each schema by field name once, instead of
+scanning them for every field.
@@ -0,0 +1,4 @@
+Add ``plone.autoform.instrumentation``: register a callable with
+``addProfileSink()`` to receive the time spent per phase and counters (fields,
+schemata, field moves, permission checks, layout cache hits) for every form
+that is set up. Without a registered sink, profiling is switched off.
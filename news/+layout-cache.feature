@@ -0,0 +1,4 @@
+Cache the fields and groups computed by ``AutoFields.updateFieldsFromSchemata``
+across requests. The cached layout is keyed on the form, its schemata and the
+outcome of the field permission checks. Set ``cacheLayout = False`` on a form
+to opt out.
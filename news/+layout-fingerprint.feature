@@ -0,0 +1,3 @@
+Add ``layoutFingerprint()`` to ``AutoExtensibleForm`` and ``WidgetsView``, a
+digest of the fields, form hints and fieldsets of the schemata of a form which
+can be used in ETags and cache keys without setting up the form.
@@ -0,0 +1,3 @@
+Add ``lazyWidgets`` to ``WidgetsView``: if set, widgets are only set up when
+they are looked up in ``w``, ``fieldsets`` or ``groups``. Accessing
+``widgets`` or iterating over ``w`` still sets up everything.
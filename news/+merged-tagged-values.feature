@@ -0,0 +1,3 @@
+Look up interface positions through a dict in ``mergedTaggedValuesForIRO`` and
+cache the results of ``mergedTaggedValuesForForm`` per schema, tagged value and
+form interfaces until the tagged values change.
@@ -0,0 +1,3 @@
+``ParameterizedWidget`` resolves and checks its widget factory only once,
+without changing ``widget_factory``, and formats its ``__traceback_info__``
+only when an error is actually reported.
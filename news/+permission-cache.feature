@@ -0,0 +1,4 @@
+Look up permission titles through a process-wide index, which is cleared when
+permissions are registered or unregistered. Add an opt-in
+``PermissionDecisionCache``, which caches field permission checks across
+requests per permission and a security signature provided by the integrator.
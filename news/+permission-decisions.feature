@@ -0,0 +1,4 @@
+Share field permission decisions between all schemata, groups and sub-forms
+set up during one request. The memo is available through
+``plone.autoform.utils.getPermissionDecisions(request)`` and counts its hits
+and misses.
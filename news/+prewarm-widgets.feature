@@ -0,0 +1,4 @@
+Add ``plone.autoform.warmup.prewarmWidgets()`` to resolve the widget factories
+of all form field provider schemata and file based models, e.g. at startup.
+Widget classes given to the ``widget`` directive are remembered by the cache
+of ``resolveDottedName()``.
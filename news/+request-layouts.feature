@@ -0,0 +1,3 @@
+Forms set up repeatedly within one request, like the ``AutoObjectSubForm``
+subforms of the rows of an object list, share their cached layout and only
+check the schemata for changes once per request.
@@ -0,0 +1,6 @@
+Add an opt-in ``streaming`` mode to ``WidgetsView``, which writes the page to
+the response progressively: the page up to where its template calls
+``renderFieldsets()``, then the default fieldset and each group, setting up
+each group just before it is rendered, and then the rest of the page. Each
+fieldset is rendered with the ``fieldset`` macro of the view's template, or a
+default one.
@@ -0,0 +1,4 @@
+Register the validators of ``form:validator`` only once, however often a model
+is read. Models read within ``modelValidators(name)`` drop the validators of
+the previous version of the model with that name, and
+``registeredValidators()`` lists them for diagnostics.
@@ -0,0 +1,3 @@
+Add ``plone.autoform.warmup.warmUp()``, which resolves widget factories and
+sets up the fields of all registered autoform forms once, e.g. in a parent
+process before forking workers, and reports what it warmed up.
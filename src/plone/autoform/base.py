@@ -1,19 +1,304 @@
+from collections import namedtuple
 from collections import OrderedDict
 from operator import attrgetter
+from plone.autoform.instrumentation import beginProfile
+from plone.autoform.instrumentation import currentProfile
 from plone.autoform.interfaces import ORDER_KEY
+from plone.autoform.interfaces import READ_PERMISSIONS_KEY
+from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
+from plone.autoform.utils import _cloneField
+from plone.autoform.utils import _process_prefixed_name
+from plone.autoform.utils import _schemaSnapshot
+from plone.autoform.utils import combinedGeneration
+from plone.autoform.utils import getPermissionDecisions
+from plone.autoform.utils import layoutFingerprint
 from plone.autoform.utils import processFields
 from plone.supermodel.interfaces import DEFAULT_ORDER
+from plone.supermodel.utils import mergedTaggedValueDict
 from plone.supermodel.utils import mergedTaggedValueList
 from plone.z3cform.fieldsets.group import GroupFactory
 from plone.z3cform.fieldsets.utils import move
 from z3c.form import field
+from z3c.form.interfaces import DISPLAY_MODE
+from z3c.form.interfaces import INPUT_MODE
 from z3c.form.util import expandPrefix
+from zope.deprecation import deprecate
+from zope.interface import providedBy
 
 import logging
+import warnings
 
 logger = logging.getLogger(__name__)
 _marker = object()
 
+_RULE_TREE_DEPRECATION = (
+    "The rule tree of field moves (_calculate_field_moves, _cleanup_rules "
+    "and _process_field_moves) is deprecated, updateFieldsFromSchemata() "
+    "applies the moves with _process_field_order(). It is only used for "
+    "forms which override one of these methods, and will be removed in "
+    "plone.autoform 4.0."
+)
+_RULE_TREE_METHODS = (
+    "_calculate_field_moves",
+    "_cleanup_rules",
+    "_process_field_moves",
+)
+
+# Maximum number of cached form layouts
+LAYOUT_CACHE_SIZE = 1000
+
+# (form, schemata, prefixes, ...) => _LayoutCacheEntry
+_layout_cache = {}
+
+
+_REQUEST_LAYOUTS_ATTR = "_plone_autoform_layouts"
+
+
+def _requestLayouts(request):
+    """Return the layout cache entries validated within the given request as
+    {key: (generation stamps, entry)}. If the request cannot hold them, a new
+    dict is returned every time.
+    """
+    layouts = getattr(request, _REQUEST_LAYOUTS_ATTR, None)
+    if layouts is None:
+        layouts = {}
+        try:
+            setattr(request, _REQUEST_LAYOUTS_ATTR, layouts)
+        except (AttributeError, TypeError):
+            pass
+    return layouts
+
+
+class _LayoutCacheEntry:
+    """Cached layouts for one form setup. There is one layout per outcome of
+    the permission checks for the guarded fields.
+    """
+
+    def __init__(self, schemata, snapshot, guarded):
+        # keeps the schemata, so that their ids in the key are not reused
+        self.schemata = schemata
+        self.snapshot = snapshot
+        self.guarded = guarded
+        self.plans = {}
+
+    def decisions(self, form, check_permissions):
+        if not check_permissions:
+            return (True,) * len(self.guarded)
+        decisions = getPermissionDecisions(form.request)
+        hits, misses = decisions.hits, decisions.misses
+        result = tuple(
+            decisions.check(permission_name, form.context)
+            for _, permission_name in self.guarded
+        )
+        profile = currentProfile(form)
+        profile.count("permission_checks", decisions.misses - misses)
+        profile.count("permission_cache_hits", decisions.hits - hits)
+        return result
+
+
+class _LayoutPlan:
+    """Snapshot of the fields and groups set up by
+    AutoFields.updateFieldsFromSchemata().
+    """
+
+    def __init__(self, fields, groups, originals, problems):
+        self.fields = fields
+        self.groups = groups
+        self.originals = originals
+        self.problems = problems
+
+    @classmethod
+    def create(cls, form, originals):
+        """Snapshot the current fields and groups of the form. Fields in
+        originals (those passed in via the form class) are shared as before,
+        all others are copied on every use.
+        """
+        groups = []
+        for group in form.groups:
+            if type(group) is not GroupFactory:
+                return None
+            groups.append(
+                (
+                    group.__name__,
+                    group.label,
+                    group.description,
+                    group.order,
+                    cls._copy(group.fields.values(), originals),
+                )
+            )
+        return cls(
+            cls._copy(form.fields.values(), originals),
+            tuple(groups),
+            frozenset(originals),
+            tuple(form.fieldMoveProblems),
+        )
+
+    @staticmethod
+    def _copy(fields, originals):
+        return tuple(f if f in originals else _cloneField(f) for f in fields)
+
+    def apply(self, form):
+        form.fields = field.Fields(*self._copy(self.fields, self.originals))
+        form.groups = [
+            GroupFactory(
+                name,
+                field.Fields(*self._copy(fields, self.originals)),
+                label,
+                description,
+                order,
+            )
+            for name, label, description, order, fields in self.groups
+        ]
+        form.fieldMoveProblems = list(self.problems)
+
+
+FieldMoveProblem = namedtuple(
+    "FieldMoveProblem", ["kind", "field", "direction", "target"]
+)
+FieldMoveProblem.__doc__ = """A field move which could not be applied.
+
+kind is either 'missing' if the field or its target is not in the form, or
+'cycle' if the move depends on a circular chain of moves.
+"""
+
+
+def _solve_field_moves(order):
+    """Turn a list of (field name, 'before'/'after', other field name) rules
+    into the sequence of moves to apply, in one pass over the rules.
+
+    A later rule for the same field overrides an earlier one. Moves are
+    applied starting from the fields which are not moved themselves, each
+    move followed by the moves relative to the field just moved. Rules
+    forming a cycle can not be resolved this way and are reported as
+    problems.
+    """
+    rule_of = {}  # source => [target, direction]
+    dependents = {}  # target => {source: None}, in insertion order
+    roots = {}  # targets which are never moved themselves, in order
+    known = set()
+
+    for source, direction, target in order:
+        rule = rule_of.get(source)
+        if rule is None:
+            rule_of[source] = [target, direction]
+        elif rule[0] != target:
+            del dependents[rule[0]][source]
+            rule_of[source] = [target, direction]
+        else:
+            rule[1] = direction
+        known.add(source)
+        roots.pop(source, None)
+        if target not in known:
+            known.add(target)
+            roots[target] = None
+        dependents.setdefault(target, {})[source] = None
+
+    moves = []
+    visited = set()
+    stack = list(reversed(roots))
+    while stack:
+        name = stack.pop()
+        visited.add(name)
+        rule = rule_of.get(name)
+        if rule is not None:
+            moves.append((name, rule[1], rule[0]))
+        stack.extend(reversed(dependents.get(name, ())))
+
+    problems = [
+        FieldMoveProblem("cycle", source, direction, target)
+        for source, (target, direction) in rule_of.items()
+        if source not in visited
+    ]
+    return moves, problems
+
+
+class _FieldOrder:
+    """The order of the fields of a form and its groups, as a linked list
+    so that each move is done in constant time.
+    """
+
+    def __init__(self, form):
+        self.form = form
+        self.containers = [form] + list(form.groups)
+        self.fields = {}
+        self.owner = {}
+        self.prev = {}
+        self.next = {}
+        self.head = []
+        self.tail = []
+        self.changed = set()
+        for index, container in enumerate(self.containers):
+            last = None
+            self.head.append(None)
+            self.tail.append(None)
+            for name, field_instance in container.fields.items():
+                if name in self.owner:
+                    # duplicate names, first one wins like in plone.z3cform
+                    continue
+                self.fields[name] = field_instance
+                self._link(index, name, last, None)
+                last = name
+
+    def _link(self, index, name, prev, next):
+        self.owner[name] = index
+        self.prev[name] = prev
+        self.next[name] = next
+        if prev is None:
+            self.head[index] = name
+        else:
+            self.next[prev] = name
+        if next is None:
+            self.tail[index] = name
+        else:
+            self.prev[next] = name
+
+    def _unlink(self, name):
+        index = self.owner.pop(name)
+        prev = self.prev.pop(name)
+        next = self.next.pop(name)
+        if prev is None:
+            self.head[index] = next
+        else:
+            self.next[prev] = next
+        if next is None:
+            self.tail[index] = prev
+        else:
+            self.prev[next] = prev
+        self.changed.add(index)
+
+    def move(self, name, direction, target):
+        """Move field name before or after target, which may be '*' for the
+        start or end of the form. Returns a FieldMoveProblem if the move
+        cannot be done.
+        """
+        if name not in self.owner or (target != "*" and target not in self.owner):
+            return FieldMoveProblem("missing", name, direction, target)
+        self._unlink(name)
+        if target == "*":
+            index = 0
+            if direction == "before":
+                prev, next = None, self.head[index]
+            else:
+                prev, next = self.tail[index], None
+        else:
+            index = self.owner[target]
+            if direction == "before":
+                prev, next = self.prev[target], target
+            else:
+                prev, next = target, self.next[target]
+        self._link(index, name, prev, next)
+        self.changed.add(index)
+
+    def apply(self):
+        """Update the fields of the changed containers"""
+        for index in self.changed:
+            ordered = []
+            name = self.head[index]
+            while name is not None:
+                ordered.append(self.fields[name])
+                name = self.next[name]
+            self.containers[index].fields = field.Fields(*ordered)
+
 
 class AutoFields:
     """Mixin class for the WidgetsView and AutoExtensibleForm classes.
@@ -29,6 +314,12 @@ class AutoFields:
     ignorePrefix = False
     autoGroups = False
 
+    # Field moves which could not be applied, see FieldMoveProblem
+    fieldMoveProblems = ()
+
+    # Re-use the computed fields and groups for identical forms
+    cacheLayout = True
+
     def updateFieldsFromSchemata(self):
         # If the form is called from the ++widget++ traversal namespace,
         # we won't have a user yet. In this case, we can't perform permission
@@ -36,6 +327,73 @@ class AutoFields:
 
         have_user = bool(self.request.get("AUTHENTICATED_USER", False))
 
+        profile = beginProfile(self)
+        try:
+            self._update_fields(have_user, profile)
+        finally:
+            profile.end()
+
+    def _update_fields(self, have_user, profile):
+        prefixes = self._calculate_prefixes()
+        originals = self._initial_fields()
+
+        if not self.cacheLayout:
+            self._update_fields_from_schemata(prefixes, have_user)
+            return
+
+        # The layout only depends on the form, its schemata and the outcome
+        # of the field permission checks. Compute it once and re-use it for
+        # subsequent requests.
+        # Schemata are told apart by identity, as different schemata may be
+        # equal, e.g. those of unnamed models.
+        schemata = self._schemata()
+        try:
+            key = (
+                self._layout_cache_key(prefixes, originals),
+                tuple(id(schema) for schema in schemata),
+            )
+            entry = _layout_cache.get(key)
+        except TypeError:
+            # unhashable parts in the key, do not cache
+            self._update_fields_from_schemata(prefixes, have_user)
+            return
+
+        # Forms set up repeatedly within one request, like the subforms of
+        # the rows of an object list, only snapshot the schemata once.
+        layouts = _requestLayouts(self.request)
+        stamp = tuple(combinedGeneration(schema) for schema in schemata)
+        shared = layouts.get(key)
+        if shared is None or shared[0] != stamp or shared[1] is not entry:
+            snapshot = tuple(_schemaSnapshot(schema) for schema in schemata)
+            if entry is None or entry.snapshot != snapshot:
+                entry = _LayoutCacheEntry(
+                    tuple(schemata), snapshot, self._guarded_fields(prefixes)
+                )
+                if len(_layout_cache) >= LAYOUT_CACHE_SIZE:
+                    _layout_cache.clear()
+                _layout_cache[key] = entry
+            layouts[key] = (stamp, entry)
+
+        decisions = entry.decisions(self, have_user)
+        plan = entry.plans.get(decisions)
+        profile.mark("prepare")
+        if plan is not None:
+            profile.count("layout_cache_hits")
+            plan.apply(self)
+            profile.mark("layout_cache")
+            return
+
+        profile.count("layout_cache_misses")
+        self._update_fields_from_schemata(prefixes, have_user)
+        plan = _LayoutPlan.create(self, originals)
+        if plan is not None:
+            if len(entry.plans) >= LAYOUT_CACHE_SIZE:
+                entry.plans.clear()
+            entry.plans[decisions] = plan
+        profile.mark("layout_cache")
+
+    def _update_fields_from_schemata(self, prefixes, have_user):
+        """Set up fields and groups from the schemata, without any caching"""
         # Turn fields into an instance variable, since we will be modifying it
         self.fields = field.Fields(self.fields)
 
@@ -58,18 +416,17 @@ class AutoFields:
         # the class
         self.groups = groups
 
-        prefixes = {}
-
         if self.schema is not None:
             processFields(self, self.schema, permissionChecks=have_user)
 
+        # Names of the groups, kept up to date as processFields() appends
+        # groups
+        group_names = set()
+        indexed_groups = 0
+
         # Set up all widgets, modes, omitted fields and fieldsets
         for schema in self.additionalSchemata:
-            # Find the prefix to use for this form and cache for next round
-            prefix = self.getPrefix(schema)
-            if prefix and prefix in prefixes:
-                prefix = schema.__identifier__
-            prefixes[schema] = prefix
+            prefix = prefixes[schema]
 
             # By default, there's no default group, i.e. fields go
             # straight into the default fieldset
@@ -84,15 +441,12 @@ class AutoFields:
                 group_name = schema.__name__ or prefix or None
 
                 # Look for group - note that previous processFields
-                # may have changed the groups list, so we can't easily
-                # store this in a dict.
-                found = False
-                for g in self.groups:
-                    if group_name == getattr(g, "__name__", g.label):
-                        found = True
-                        break
-
-                if not found:
+                # may have appended groups to the list.
+                for g in self.groups[indexed_groups:]:
+                    group_names.add(getattr(g, "__name__", g.label))
+                indexed_groups = len(self.groups)
+
+                if group_name not in group_names:
                     fieldset_group = GroupFactory(
                         group_name,
                         field.Fields(),
@@ -112,23 +466,92 @@ class AutoFields:
                 permissionChecks=have_user,
             )
 
-        # Then process relative field movements. The base schema is processed
-        # last to allow it to override any movements made in additional
-        # schemata.
-        rules = {"__all__": {}}
+        # Then process relative field movements.
+        profile = currentProfile(self)
+        profile.mark("prepare")
+        self._process_field_order(prefixes)
+        profile.mark("moves")
+        self._process_group_order()
+        profile.mark("group_order")
+
+    def _calculate_prefixes(self):
+        """Find the prefix to use for each of the additional schemata"""
+        prefixes = {}
         for schema in self.additionalSchemata:
-            order = mergedTaggedValueList(schema, ORDER_KEY)
-            rules = self._calculate_field_moves(
-                order,
-                prefix=prefixes[schema],
-                rules=rules,
-            )
+            prefix = self.getPrefix(schema)
+            if prefix and prefix in prefixes:
+                prefix = schema.__identifier__
+            prefixes[schema] = prefix
+        return prefixes
+
+    def layoutFingerprint(self):
+        """A hex digest of everything in the schemata of this form which
+        influences its layout, see plone.autoform.utils.layoutFingerprint().
+        It can be computed without setting up the form.
+        """
+        prefixes = self._calculate_prefixes()
         if self.schema is not None:
-            order = mergedTaggedValueList(self.schema, ORDER_KEY)
-            rules = self._calculate_field_moves(order, rules=rules)
-        self._cleanup_rules(rules)
-        self._process_field_moves(rules)
-        self._process_group_order()
+            prefixes[self.schema] = ""
+        return layoutFingerprint(self._schemata(), prefixes)
+
+    def _schemata(self):
+        """All schemata the fields of this form are taken from"""
+        schemata = list(self.additionalSchemata)
+        if self.schema is not None:
+            schemata.insert(0, self.schema)
+        return schemata
+
+    def _initial_fields(self):
+        """The fields set on the form and its groups before processing"""
+        fields = list(self.fields.values())
+        for group in self.groups:
+            fields.extend(group.fields.values())
+        return fields
+
+    def _layout_cache_key(self, prefixes, originals):
+        """Everything besides the schemata contents and the permission checks
+        which influences the outcome of updateFieldsFromSchemata().
+        """
+        groups = tuple(
+            (
+                getattr(group, "__name__", group.label),
+                group.label,
+                getattr(group, "description", None),
+                tuple(group.fields.keys()),
+            )
+            for group in self.groups
+        )
+        return (
+            type(self),
+            providedBy(self),
+            getattr(self, "mode", None),
+            getattr(self, "showEmptyGroups", False),
+            self.autoGroups,
+            self.schema,
+            tuple(prefixes.items()),
+            tuple(originals),
+            groups,
+        )
+
+    def _guarded_fields(self, prefixes):
+        """Return a tuple of (field name, permission name) pairs for all
+        fields whose presence in the form depends on a permission check.
+        """
+        mode = getattr(self, "mode", None)
+        if mode == DISPLAY_MODE:
+            key = READ_PERMISSIONS_KEY
+        elif mode == INPUT_MODE:
+            key = WRITE_PERMISSIONS_KEY
+        else:
+            return ()
+        guarded = []
+        schemata = [(self.schema, "")] if self.schema is not None else []
+        schemata.extend(prefixes.items())
+        for schema, prefix in schemata:
+            for name, permission in mergedTaggedValueDict(schema, key).items():
+                if name in schema:
+                    guarded.append((_process_prefixed_name(prefix, name), permission))
+        return tuple(guarded)
 
     def getPrefix(self, schema):
         """Get the preferred prefix for the given schema"""
@@ -151,14 +574,81 @@ class AutoFields:
                 target = expandPrefix(prefix) + target
         return source, target
 
+    def _process_field_order(self, prefixes):
+        """Apply all ORDER_KEY rules of the schemata to the fields of the
+        form and its groups. The base schema is processed last to allow it to
+        override any movements made in additional schemata.
+        """
+        if any(
+            getattr(type(self), name) is not getattr(AutoFields, name)
+            for name in _RULE_TREE_METHODS
+        ):
+            # BBB for forms customizing the rule tree
+            warnings.warn(_RULE_TREE_DEPRECATION, DeprecationWarning, stacklevel=2)
+            self._process_rule_tree(prefixes)
+            return
+
+        order = []
+        for schema in self.additionalSchemata:
+            prefix = prefixes[schema]
+            for source, direction, target in mergedTaggedValueList(schema, ORDER_KEY):
+                order.append(self._prepare_move(source, direction, target, prefix))
+        if self.schema is not None:
+            for source, direction, target in mergedTaggedValueList(
+                self.schema, ORDER_KEY
+            ):
+                order.append(self._prepare_move(source, direction, target, ""))
+
+        moves, problems = _solve_field_moves(order)
+        currentProfile(self).count("moves", len(moves))
+        if moves:
+            field_order = _FieldOrder(self)
+            for source, direction, target in moves:
+                problem = field_order.move(source, direction, target)
+                if problem is not None:
+                    problems.append(problem)
+            field_order.apply()
+
+        if problems and logger.isEnabledFor(logging.DEBUG):
+            for problem in problems:
+                logger.debug("Field move not applied: %s", problem)
+        self.fieldMoveProblems = problems
+
+    def _process_rule_tree(self, prefixes):
+        rules = {"__all__": {}}
+        for schema in self.additionalSchemata:
+            order = mergedTaggedValueList(schema, ORDER_KEY)
+            rules = self._calculate_field_moves(
+                order,
+                prefix=prefixes[schema],
+                rules=rules,
+            )
+        if self.schema is not None:
+            order = mergedTaggedValueList(self.schema, ORDER_KEY)
+            rules = self._calculate_field_moves(order, rules=rules)
+        self._cleanup_rules(rules)
+        self._process_field_moves(rules)
+        self.fieldMoveProblems = []
+
+    def _prepare_move(self, source, direction, target, prefix):
+        if direction not in ("before", "after"):
+            raise ValueError(
+                "Direction of a field move must be before or after, "
+                "but got {}.".format(direction)
+            )
+        source, target = self._prepare_names(source, target, prefix)
+        return source, direction, target
+
+    @deprecate(_RULE_TREE_DEPRECATION)
     def _cleanup_rules(self, rules):
         for rulename in rules["__all__"]:
             if "parent" in rules["__all__"][rulename]:
                 del rules["__all__"][rulename]["parent"]
         del rules["__all__"]
 
+    @deprecate(_RULE_TREE_DEPRECATION)
     def _calculate_field_moves(self, order, prefix="", rules=None):
-        """Calculates all needed field rules"""
+        """Calculates all needed field rules as a tree."""
         # we want to be independent from the order of the schemas coming later
         # so a if field_c is first moved after field_a, then field_a is moved
         # after field_c, the output should be: b, a, c, because or first move
@@ -210,6 +700,7 @@ class AutoFields:
 
         return rules
 
+    @deprecate(_RULE_TREE_DEPRECATION)
     def _process_field_moves(self, rules):
         """move fields according to the rules"""
         for name, rule in rules.items():
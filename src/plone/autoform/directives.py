@@ -4,6 +4,10 @@ from plone.autoform.interfaces import ORDER_KEY
 from plone.autoform.interfaces import READ_PERMISSIONS_KEY
 from plone.autoform.interfaces import WIDGETS_KEY
 from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
+from plone.autoform.utils import _dottedCache
+from plone.autoform.utils import _intern
+from plone.autoform.utils import fieldHint
+from plone.autoform.utils import orderHint
 from plone.autoform.widgets import ParameterizedWidget
 from plone.supermodel.directives import DictCheckerPlugin
 from plone.supermodel.directives import ListCheckerPlugin
@@ -28,7 +32,7 @@ class omitted(MetadataListDirective):
         if IInterface.providedBy(args[0]):
             form_interface = args[0]
             args = args[1:]
-        return [(form_interface, field, self.value) for field in args]
+        return [fieldHint(form_interface, field, self.value) for field in args]
 
 
 class no_omit(omitted):
@@ -58,7 +62,7 @@ class mode(MetadataListDirective):
         form_interface = Interface
         if args:
             form_interface = args[0]
-        return [(form_interface, field, mode) for field, mode in kw.items()]
+        return [fieldHint(form_interface, field, mode) for field, mode in kw.items()]
 
 
 class ModePlugin(OmittedPlugin):
@@ -114,8 +118,10 @@ class widget(MetadataDictDirective):
         if field_name is None:  # Usage 3
             for field_name, widget in kw.items():
                 if not isinstance(widget, str):
+                    resolved = widget
                     widget = f"{widget.__module__}.{widget.__name__}"
-                widgets[field_name] = widget
+                    _dottedCache.prime(widget, resolved)
+                widgets[_intern(field_name)] = _intern(widget)
         else:
             if (
                 widget_class is not None
@@ -123,7 +129,7 @@ class widget(MetadataDictDirective):
                 and not IWidget.implementedBy(widget_class)
             ):
                 raise TypeError("widget_class must implement IWidget or IFieldWidget")
-            widgets[field_name] = ParameterizedWidget(widget_class, **kw)
+            widgets[_intern(field_name)] = ParameterizedWidget(widget_class, **kw)
 
         return widgets
 
@@ -139,7 +145,7 @@ class order_before(MetadataListDirective):
 
     def factory(self, **kw):
         return [
-            (field_name, "before", relative_to)
+            orderHint(field_name, "before", relative_to)
             for field_name, relative_to in kw.items()
         ]
 
@@ -151,7 +157,8 @@ class order_after(MetadataListDirective):
 
     def factory(self, **kw):
         return [
-            (field_name, "after", relative_to) for field_name, relative_to in kw.items()
+            orderHint(field_name, "after", relative_to)
+            for field_name, relative_to in kw.items()
         ]
 
 
@@ -171,7 +178,7 @@ class read_permission(MetadataDictDirective):
     key = READ_PERMISSIONS_KEY
 
     def factory(self, **kw):
-        return kw
+        return {_intern(name): _intern(value) for name, value in kw.items()}
 
 
 class write_permission(read_permission):
@@ -0,0 +1,126 @@
+"""Timings and counters for setting up the fields of autoform forms.
+
+Register a sink (any callable taking a FormBuildProfile) with
+addProfileSink() to receive a profile for every form that is set up. As long
+as no sink is registered, profiling is switched off and costs next to
+nothing.
+"""
+
+from time import perf_counter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_sinks = []
+
+_PROFILE_ATTR = "_plone_autoform_profile"
+
+
+def addProfileSink(sink):
+    """Register a callable which is called with a FormBuildProfile each time
+    the fields of a form have been set up.
+    """
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def removeProfileSink(sink):
+    """Unregister a sink registered with addProfileSink()"""
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+class FormBuildProfile:
+    """Time spent per phase and counters for setting up one form.
+
+    ``timings`` maps phase names to seconds, ``counters`` maps counter names
+    to numbers. Phases used by plone.autoform are:
+
+    - ``prepare``: preparing and looking up the layout cache
+    - ``merge``: merging omitted and mode hints for the form
+    - ``fields``: constructing the z3c.form fields of the schemata
+    - ``permissions``: checking field permissions
+    - ``fieldsets``: distributing the fields over the form and its groups
+    - ``widgets``: setting up widget factories and modes
+    - ``moves``: applying field moves
+    - ``group_order``: sorting the groups
+    - ``layout_cache``: copying a cached layout onto the form
+
+    Counters are ``schemata``, ``fields``, ``moves``, ``permission_checks``,
+    ``permission_cache_hits``, ``layout_cache_hits`` and
+    ``layout_cache_misses``.
+    """
+
+    def __init__(self, form):
+        self.form = form
+        self.timings = {}
+        self.counters = {}
+        self.total = 0.0
+        self._depth = 0
+        self._start = self._last = perf_counter()
+
+    def mark(self, phase):
+        """Add the time since the previous mark to the given phase"""
+        now = perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def end(self):
+        """Finish the profile once the outermost build step is done"""
+        self._depth -= 1
+        if self._depth:
+            return
+        self.form.__dict__.pop(_PROFILE_ATTR, None)
+        self.total = perf_counter() - self._start
+        for sink in tuple(_sinks):
+            try:
+                sink(self)
+            except Exception:
+                logger.exception("Error in form build profile sink %r", sink)
+
+    def __repr__(self):
+        return "<{} for {!r} {:.6f}s>".format(
+            self.__class__.__name__, self.form, self.total
+        )
+
+
+class _NullProfile:
+    """Used instead of a FormBuildProfile if there are no sinks"""
+
+    def mark(self, phase):
+        pass
+
+    def count(self, counter, value=1):
+        pass
+
+    def end(self):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
+
+
+def beginProfile(form):
+    """Start (or continue, for nested steps) profiling the set up of a form.
+    Every call must be paired with a call to end() on the returned profile.
+    """
+    if not _sinks:
+        return NULL_PROFILE
+    profile = form.__dict__.get(_PROFILE_ATTR)
+    if profile is None:
+        profile = form.__dict__[_PROFILE_ATTR] = FormBuildProfile(form)
+    else:
+        profile.mark("prepare")
+    profile._depth += 1
+    return profile
+
+
+def currentProfile(form):
+    """The profile of the form currently set up, if any"""
+    if not _sinks:
+        return NULL_PROFILE
+    return form.__dict__.get(_PROFILE_ATTR, NULL_PROFILE)
@@ -50,6 +50,11 @@ class IAutoExtensibleForm(Interface):
         required=False,
     )
 
+    def layoutFingerprint():
+        """Return a hex digest which changes whenever the form hints,
+        fieldsets or fields of the schemata change, e.g. for use in ETags.
+        """
+
 
 class IAutoObjectSubForm(Interface):
     """This mixin class enables a form based on z3c.form.object.ObjectSubForm
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from lxml import etree
 from plone.autoform.interfaces import FORM_NAMESPACE
 from plone.autoform.interfaces import FORM_PREFIX
@@ -9,18 +10,243 @@ from plone.autoform.interfaces import SECURITY_NAMESPACE
 from plone.autoform.interfaces import SECURITY_PREFIX
 from plone.autoform.interfaces import WIDGETS_KEY
 from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
+from plone.autoform.utils import _intern
+from plone.autoform.utils import bumpGeneration
+from plone.autoform.utils import fieldHint
+from plone.autoform.utils import orderHint
 from plone.autoform.utils import resolveDottedName
 from plone.autoform.widgets import ParameterizedWidget
+from plone.supermodel.interfaces import ISchemaMetadataHandler
 from plone.supermodel.parser import IFieldMetadataHandler
 from plone.supermodel.utils import ns
 from z3c.form.interfaces import IFieldWidget
 from z3c.form.interfaces import IValidator
-from z3c.form.util import getSpecification
-from zope.component import provideAdapter
+from zope.component import getGlobalSiteManager
+from zope.interface import alsoProvides
 from zope.interface import implementer
 from zope.interface import Interface
 from zope.interface.interface import InterfaceClass
 
+import itertools
+import threading
+
+_bulk = threading.local()
+_export = threading.local()
+
+# tagged values written by FormSchema and SecuritySchema
+_EXPORT_KEYS = (
+    WIDGETS_KEY,
+    MODES_KEY,
+    OMITTED_KEY,
+    ORDER_KEY,
+    READ_PERMISSIONS_KEY,
+    WRITE_PERMISSIONS_KEY,
+)
+
+
+@contextmanager
+def bulkRead():
+    """Collect the form: and security: values of the models parsed within
+    this block per schema, and set them as tagged values once per schema
+    instead of once per field::
+
+        with bulkRead():
+            model = loadFile("models/big.xml")
+    """
+    if getattr(_bulk, "pending", None) is not None:
+        # already collecting
+        yield
+        return
+    _bulk.pending = pending = {}
+    _bulk.interfaces = {}
+    try:
+        yield
+        # values of schemata whose handlers were called directly
+        while pending:
+            _commit(*pending.popitem())
+    finally:
+        _bulk.pending = _bulk.interfaces = None
+
+
+def _pending(schema, key, factory):
+    """Return the collected values for key of schema, or None if not in
+    bulkRead()
+    """
+    pending = getattr(_bulk, "pending", None)
+    if pending is None:
+        return None
+    values = pending.get(schema)
+    if values is None:
+        values = pending[schema] = {}
+    value = values.get(key)
+    if value is None:
+        value = values[key] = factory()
+    return value
+
+
+def _commit(schema, values):
+    for key, value in values.items():
+        if isinstance(value, dict):
+            tagged_value = schema.queryTaggedValue(key, {})
+            tagged_value.update(value)
+        else:
+            tagged_value = schema.queryTaggedValue(key, [])
+            tagged_value.extend(value)
+        schema.setTaggedValue(key, tagged_value)
+    if values:
+        bumpGeneration(schema)
+
+
+def _exportIndex(schema, fieldNode):
+    """Return the tagged values written by the field handlers of schema as
+    {key: {field name: value(s)}}. While serialize() writes a schema, the
+    field nodes are children of its schema element or of one of its fieldset
+    elements. The index is built once for all of them and dropped by
+    SchemaValuesHandler.write() at the end of the schema. Fieldset elements
+    are attached only after their fields are written, so a new schema element
+    is what starts a new pass. For a field node without a parent, the index
+    is built every time.
+    """
+    parent = fieldNode.getparent()
+    element = None
+    if parent is not None:
+        if parent.tag == "schema":
+            element = parent
+        cached = getattr(_export, "index", None)
+        if (
+            cached is not None
+            and cached[0] is schema
+            and (element is None or cached[1] is element)
+        ):
+            return cached[2]
+
+    index = {}
+    for key in _EXPORT_KEYS:
+        value = schema.queryTaggedValue(key)
+        if key in (MODES_KEY, OMITTED_KEY):
+            by_name = {}
+            for interface, name, item in value or ():
+                by_name.setdefault(name, []).append((interface, item))
+        elif key == ORDER_KEY:
+            by_name = {}
+            for name, direction, relative_to in value or ():
+                by_name.setdefault(name, []).append((direction, relative_to))
+        else:
+            by_name = value or {}
+        index[key] = by_name
+    if parent is not None:
+        _export.index = (schema, element, index)
+    return index
+
+
+# (model, schema identifier, field name, validator) => marker interface
+# provided by the fields the validator is registered for
+_validators = {}
+_validatorsLock = threading.Lock()
+_validatorMarkers = itertools.count()
+
+
+def _validatorRequired(marker):
+    # context, request, view, field, widget
+    return (None, None, None, marker, None)
+
+
+@contextmanager
+def modelValidators(model):
+    """Record the validators registered by the models parsed within this
+    block under the key model, e.g. the name of the model file. When the block
+    completes, the validators recorded under the same key before and not
+    registered again are unregistered, so that reading a new version of a
+    model drops the validators the previous one had and the new one has
+    not::
+
+        with modelValidators("my.package:models/big.xml"):
+            model = loadFile("models/big.xml")
+    """
+    if getattr(_bulk, "model", None) is not None:
+        raise ValueError("modelValidators() blocks can not be nested.")
+    _bulk.model = model
+    _bulk.registered = registered = set()
+    try:
+        yield
+    finally:
+        _bulk.model = _bulk.registered = None
+    with _validatorsLock:
+        for key in list(_validators):
+            if key[0] == model and key not in registered:
+                _unregisterValidator(key, _validators.pop(key))
+
+
+def registerValidator(schema, field, validator):
+    """Register the IValidator factory validator for field of schema, as
+    form:validator does. There is one registration per model (see
+    modelValidators()), schema identifier, field name and validator, shared
+    by the fields of all versions of a schema read again and again: the
+    fields provide a marker interface the validator is registered for.
+    """
+    model = getattr(_bulk, "model", None)
+    key = (model, schema.__identifier__, field.__name__, validator)
+    with _validatorsLock:
+        marker = _validators.get(key)
+        if marker is None:
+            marker = InterfaceClass(
+                "IValidatedField%d" % next(_validatorMarkers),
+                __module__=__name__,
+            )
+            getGlobalSiteManager().registerAdapter(
+                validator, _validatorRequired(marker), IValidator, event=False
+            )
+            _validators[key] = marker
+        if model is not None:
+            _bulk.registered.add(key)
+    if not marker.providedBy(field):
+        alsoProvides(field, marker)
+
+
+def _unregisterValidator(key, marker):
+    getGlobalSiteManager().unregisterAdapter(
+        key[3], _validatorRequired(marker), IValidator
+    )
+
+
+def unregisterValidators(model):
+    """Unregister the validators recorded for model by modelValidators()"""
+    with _validatorsLock:
+        for key in list(_validators):
+            if key[0] == model:
+                _unregisterValidator(key, _validators.pop(key))
+
+
+def registeredValidators():
+    """Return a list of (model, schema identifier, field name, validator) for
+    the validators registered from form:validator, for diagnostics. model is
+    None for validators read outside of modelValidators().
+    """
+    with _validatorsLock:
+        keys = list(_validators)
+    return sorted(keys, key=lambda item: (str(item[0]), item[1:3]))
+
+
+try:
+    from zope.testing.cleanup import addCleanUp
+except ImportError:  # pragma: no cover
+    pass
+else:
+    # test set ups replace the global registry
+    addCleanUp(_validators.clear)
+
+
+def _resolve_interface(interface_dotted_name):
+    interfaces = getattr(_bulk, "interfaces", None)
+    if interfaces is not None and interface_dotted_name in interfaces:
+        return interfaces[interface_dotted_name]
+    interface = resolveDottedName(interface_dotted_name)
+    if not isinstance(interface, InterfaceClass):
+        raise ValueError(f"{interface_dotted_name} not an Interface.")
+    if interfaces is not None:
+        interfaces[interface_dotted_name] = interface
+    return interface
+
 
 @implementer(IFieldMetadataHandler)
 class FormSchema:
@@ -30,39 +256,48 @@ class FormSchema:
     prefix = FORM_PREFIX
 
     def _add(self, schema, key, name, value):
+        pending = _pending(schema, key, dict)
+        name = _intern(name)
+        if pending is not None:
+            pending[name] = _intern(value)
+            return
         tagged_value = schema.queryTaggedValue(key, {})
-        tagged_value[name] = value
+        tagged_value[name] = _intern(value)
         schema.setTaggedValue(key, tagged_value)
+        bumpGeneration(schema)
 
     def _add_order(self, schema, name, direction, relative_to):
+        hint = orderHint(name, direction, relative_to)
+        pending = _pending(schema, ORDER_KEY, list)
+        if pending is not None:
+            pending.append(hint)
+            return
         tagged_value = schema.queryTaggedValue(ORDER_KEY, [])
-        tagged_value.append((name, direction, relative_to))
+        tagged_value.append(hint)
         schema.setTaggedValue(ORDER_KEY, tagged_value)
+        bumpGeneration(schema)
 
     def _add_interface_values(self, schema, key, name, values):
-        tagged_value = schema.queryTaggedValue(key, [])
+        pending = _pending(schema, key, list)
+        tagged_value = schema.queryTaggedValue(key, []) if pending is None else pending
         values = values.split(" ")
         for value in values:
             if ":" in value:
                 interface_dotted_name, value = value.split(":")
-                interface = resolveDottedName(interface_dotted_name)
-                if not isinstance(interface, InterfaceClass):
-                    raise ValueError(f"{interface_dotted_name} not an Interface.")
+                interface = _resolve_interface(interface_dotted_name)
             else:
                 interface = Interface
-            tagged_value.append((interface, name, value))
-        schema.setTaggedValue(key, tagged_value)
+            tagged_value.append(fieldHint(interface, name, value))
+        if pending is None:
+            schema.setTaggedValue(key, tagged_value)
+            bumpGeneration(schema)
 
-    def _add_validator(self, field, value):
+    def _add_validator(self, schema, field, value):
         validator = resolveDottedName(value)
         if not IValidator.implementedBy(validator):
             msg = "z3c.form.interfaces.IValidator not implemented by {0}."
             raise ValueError(msg.format(value))
-        provideAdapter(
-            validator,
-            (None, None, None, getSpecification(field), None),
-            IValidator,
-        )
+        registerValidator(schema, field, validator)
 
     def read(self, fieldNode, schema, field):
         name = field.__name__
@@ -83,7 +318,7 @@ class FormSchema:
         if after:
             self._add_order(schema, name, "after", after)
         if validator:
-            self._add_validator(field, validator)
+            self._add_validator(schema, field, validator)
 
         widgetNode = fieldNode.find(ns("widget", self.namespace))
         widget = None
@@ -107,16 +342,11 @@ class FormSchema:
     def write(self, fieldNode, schema, field):
         name = field.__name__
 
-        widget = schema.queryTaggedValue(WIDGETS_KEY, {}).get(name, None)
-        mode = [
-            (i, v) for i, n, v in schema.queryTaggedValue(MODES_KEY, []) if n == name
-        ]
-        omitted = [
-            (i, v) for i, n, v in schema.queryTaggedValue(OMITTED_KEY, []) if n == name
-        ]
-        order = [
-            (d, v) for n, d, v in schema.queryTaggedValue(ORDER_KEY, []) if n == name
-        ]
+        index = _exportIndex(schema, fieldNode)
+        widget = index[WIDGETS_KEY].get(name, None)
+        mode = index[MODES_KEY].get(name, ())
+        omitted = index[OMITTED_KEY].get(name, ())
+        order = index[ORDER_KEY].get(name, ())
 
         if widget is not None:
             if not isinstance(widget, ParameterizedWidget):
@@ -163,10 +393,19 @@ class SecuritySchema:
     prefix = SECURITY_PREFIX
 
     def read(self, fieldNode, schema, field):
-        name = field.__name__
+        name = _intern(field.__name__)
+
+        read_permission = _intern(fieldNode.get(ns("read-permission", self.namespace)))
+        write_permission = _intern(
+            fieldNode.get(ns("write-permission", self.namespace))
+        )
 
-        read_permission = fieldNode.get(ns("read-permission", self.namespace))
-        write_permission = fieldNode.get(ns("write-permission", self.namespace))
+        if getattr(_bulk, "pending", None) is not None:
+            if read_permission:
+                _pending(schema, READ_PERMISSIONS_KEY, dict)[name] = read_permission
+            if write_permission:
+                _pending(schema, WRITE_PERMISSIONS_KEY, dict)[name] = write_permission
+            return
 
         read_permissions = schema.queryTaggedValue(READ_PERMISSIONS_KEY, {})
         write_permissions = schema.queryTaggedValue(WRITE_PERMISSIONS_KEY, {})
@@ -179,17 +418,40 @@ class SecuritySchema:
             write_permissions[name] = write_permission
             schema.setTaggedValue(WRITE_PERMISSIONS_KEY, write_permissions)
 
+        if read_permission or write_permission:
+            bumpGeneration(schema)
+
     def write(self, fieldNode, schema, field):
         name = field.__name__
 
-        read_permission = schema.queryTaggedValue(READ_PERMISSIONS_KEY, {}).get(
-            name, None
-        )
-        write_permission = schema.queryTaggedValue(WRITE_PERMISSIONS_KEY, {}).get(
-            name, None
-        )
+        index = _exportIndex(schema, fieldNode)
+        read_permission = index[READ_PERMISSIONS_KEY].get(name, None)
+        write_permission = index[WRITE_PERMISSIONS_KEY].get(name, None)
 
         if read_permission:
             fieldNode.set(ns("read-permission", self.namespace), read_permission)
         if write_permission:
             fieldNode.set(ns("write-permission", self.namespace), write_permission)
+
+
+@implementer(ISchemaMetadataHandler)
+class SchemaValuesHandler:
+    """Called once all fields of a schema have been read or written. Sets the
+    values collected by FormSchema and SecuritySchema within bulkRead() on
+    the schema, and drops the index used for writing the fields.
+    """
+
+    namespace = None
+    prefix = None
+
+    def read(self, schemaNode, schema):
+        pending = getattr(_bulk, "pending", None)
+        if pending:
+            values = pending.pop(schema, None)
+            if values:
+                _commit(schema, values)
+
+    def write(self, schemaNode, schema):
+        cached = getattr(_export, "index", None)
+        if cached is not None and cached[0] is schema:
+            _export.index = None
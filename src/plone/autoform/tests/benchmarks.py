@@ -0,0 +1,317 @@
+"""Benchmarks for setting up forms from schemata.
+
+Synthetic schemata with a configurable number of fields, additional schemata
+and fieldsets are generated, using all kinds of form hints: omitted fields and
+modes for particular form interfaces, widgets, read/write permissions and
+chains of field moves. The phases of setting up a form are timed separately.
+
+Run them with::
+
+    python -m plone.autoform.tests.benchmarks
+
+Use ``--check`` to fail if any phase scales worse than ``--max-exponent`` with
+the number of fields (a quadratic slowdown has an exponent of 2).
+"""
+
+from plone.autoform.form import AutoExtensibleForm
+from plone.autoform.interfaces import MODES_KEY
+from plone.autoform.interfaces import OMITTED_KEY
+from plone.autoform.interfaces import ORDER_KEY
+from plone.autoform.interfaces import READ_PERMISSIONS_KEY
+from plone.autoform.interfaces import WIDGETS_KEY
+from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
+from plone.autoform.utils import processFields
+from plone.autoform.view import WidgetsView
+from plone.autoform.widgets import ParameterizedWidget
+from plone.supermodel.interfaces import FIELDSETS_KEY
+from plone.supermodel.model import Fieldset
+from z3c.form.form import Form
+from z3c.form.interfaces import IEditForm
+from z3c.form.interfaces import IForm
+from z3c.form.interfaces import IFormLayer
+from zope.interface import alsoProvides
+from zope.interface import Interface
+from zope.interface.interface import InterfaceClass
+from zope.publisher.browser import TestRequest
+
+import argparse
+import math
+import sys
+import time
+import zope.schema
+
+PERMISSION = "plone.autoform.benchmark"
+
+PHASES = (
+    "processFields",
+    "updateFieldsFromSchemata",
+    "updateFieldsFromSchemata (cached)",
+    "updateFields",
+    "WidgetsView._update",
+)
+
+
+def makeSchema(name, fields=10, fieldsets=0, moves=0):
+    """Create a schema with the given number of fields, fieldsets and field
+    moves, and form hints on about half of the fields.
+    """
+    attrs = {
+        f"field{i}": zope.schema.TextLine(title=f"Field {i}", required=False)
+        for i in range(fields)
+    }
+    attrs["__module__"] = __name__
+    schema = InterfaceClass(name, (Interface,), attrs)
+
+    names = [f"field{i}" for i in range(fields)]
+    omitted = []
+    modes = []
+    widgets = {}
+    read_permissions = {}
+    write_permissions = {}
+    for i, field_name in enumerate(names):
+        kind = i % 10
+        if kind == 1:
+            omitted.append((IEditForm, field_name, "true"))
+            omitted.append((IForm, field_name, "false"))
+        elif kind == 2:
+            modes.append((Interface, field_name, "display"))
+            modes.append((IForm, field_name, "hidden"))
+        elif kind == 3:
+            widgets[field_name] = "z3c.form.browser.textarea.TextAreaFieldWidget"
+        elif kind == 4:
+            widgets[field_name] = ParameterizedWidget(None, klass="benchmark")
+        elif kind == 5:
+            read_permissions[field_name] = PERMISSION
+            write_permissions[field_name] = PERMISSION
+    schema.setTaggedValue(OMITTED_KEY, omitted)
+    schema.setTaggedValue(MODES_KEY, modes)
+    schema.setTaggedValue(WIDGETS_KEY, widgets)
+    schema.setTaggedValue(READ_PERMISSIONS_KEY, read_permissions)
+    schema.setTaggedValue(WRITE_PERMISSIONS_KEY, write_permissions)
+
+    # a chain of moves, each relative to the next field
+    order = []
+    for i in range(min(moves, fields - 1)):
+        direction = "after" if i % 2 else "before"
+        order.append((names[i], direction, "." + names[i + 1]))
+    schema.setTaggedValue(ORDER_KEY, order)
+
+    if fieldsets:
+        fieldset_fields = [[] for i in range(fieldsets)]
+        for i, field_name in enumerate(names[len(names) // 2 :]):
+            fieldset_fields[i % fieldsets].append(field_name)
+        schema.setTaggedValue(
+            FIELDSETS_KEY,
+            [
+                Fieldset(f"fieldset{i}", label=f"Fieldset {i}", fields=fields)
+                for i, fields in enumerate(fieldset_fields)
+            ],
+        )
+    return schema
+
+
+def makeSchemata(fields=10, schemata=0, fieldsets=0, moves=0):
+    """Create a main schema and additional schemata, which share the
+    fields, fieldsets and moves between them.
+    """
+    count = schemata + 1
+    main = makeSchema(
+        "IMain", max(fields // count, 1), max(fieldsets // count, 0), moves // count
+    )
+    additional = tuple(
+        makeSchema(
+            f"IBehavior{i}",
+            max(fields // count, 1),
+            max(fieldsets // count, 0),
+            moves // count,
+        )
+        for i in range(schemata)
+    )
+    return main, additional
+
+
+def makeRequest():
+    return TestRequest(environ={"AUTHENTICATED_USER": "benchmark"}, skin=IFormLayer)
+
+
+class Context:
+    pass
+
+
+def makeContext(schemata):
+    context = Context()
+    alsoProvides(context, *schemata)
+    return context
+
+
+def makeForm(schema, additional, cacheLayout=True):
+    return type(
+        "BenchmarkForm",
+        (AutoExtensibleForm, Form),
+        {
+            "schema": schema,
+            "additionalSchemata": additional,
+            "ignoreContext": True,
+            "cacheLayout": cacheLayout,
+        },
+    )
+
+
+def makeView(schema, additional):
+    view = type(
+        "BenchmarkView",
+        (WidgetsView,),
+        {"schema": schema, "additionalSchemata": additional},
+    )
+    view.render = lambda self: ""
+    return view
+
+
+def measure(func, repeat=5):
+    """Return the best time of several runs of func, in seconds"""
+    func()  # warm up caches
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def benchmark(fields=10, schemata=0, fieldsets=0, moves=0, repeat=5):
+    """Time the phases of setting up forms for one configuration. Returns a
+    dict of phase => seconds.
+    """
+    schema, additional = makeSchemata(fields, schemata, fieldsets, moves)
+    context = makeContext((schema,) + additional)
+    uncached_form = makeForm(schema, additional, cacheLayout=False)
+    cached_form = makeForm(schema, additional)
+    view = makeView(schema, additional)
+
+    def process_fields():
+        form = Form(context, makeRequest())
+        form.groups = []
+        processFields(form, schema, permissionChecks=True)
+        for additional_schema in additional:
+            processFields(
+                form,
+                additional_schema,
+                prefix=additional_schema.__name__,
+                permissionChecks=True,
+            )
+
+    def update_fields_from_schemata():
+        uncached_form(context, makeRequest()).updateFieldsFromSchemata()
+
+    def update_fields_from_schemata_cached():
+        cached_form(context, makeRequest()).updateFieldsFromSchemata()
+
+    def update_fields():
+        cached_form(context, makeRequest()).updateFields()
+
+    def widgets_view_update():
+        view(context, makeRequest())._update()
+
+    return {
+        "processFields": measure(process_fields, repeat),
+        "updateFieldsFromSchemata": measure(update_fields_from_schemata, repeat),
+        "updateFieldsFromSchemata (cached)": measure(
+            update_fields_from_schemata_cached, repeat
+        ),
+        "updateFields": measure(update_fields, repeat),
+        "WidgetsView._update": measure(widgets_view_update, repeat),
+    }
+
+
+def scalingExponents(small, large, **kw):
+    """Estimate how the time of each phase grows with the number of fields:
+    1 is linear, 2 quadratic. Returns a dict phase => exponent.
+    """
+    small_times = benchmark(fields=small, **kw)
+    large_times = benchmark(fields=large, **kw)
+    return {
+        phase: math.log(large_times[phase] / small_times[phase])
+        / math.log(large / small)
+        for phase in small_times
+    }
+
+
+def checkScaling(small=100, large=800, maxExponent=1.5, attempts=3, **kw):
+    """Raise an AssertionError if a phase scales worse than maxExponent.
+    Timings are noisy, so a phase has to fail in all attempts.
+    """
+    exponents = {}
+    slow = set(PHASES)
+    for i in range(attempts):
+        exponents = scalingExponents(small, large, **kw)
+        slow = {phase for phase in slow if exponents[phase] > maxExponent}
+        if not slow:
+            return exponents
+    raise AssertionError(
+        "Form setup scales worse than O(n^{}): {}".format(
+            maxExponent,
+            ", ".join(f"{phase} O(n^{exponents[phase]:.2f})" for phase in sorted(slow)),
+        )
+    )
+
+
+def setUpComponents():
+    """Load the component registrations needed to set up forms"""
+    from io import StringIO
+    from zope.component import provideUtility
+    from zope.configuration import xmlconfig
+    from zope.security.permission import Permission
+
+    configuration = """\
+<configure xmlns="http://namespaces.zope.org/zope">
+    <include package="Products.Five" file="configure.zcml" />
+    <include package="plone.autoform" />
+</configure>
+"""
+    xmlconfig.xmlconfig(StringIO(configuration))
+    provideUtility(Permission(PERMISSION, PERMISSION, ""), name=PERMISSION)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fields", type=int, nargs="+", default=[10, 100, 500, 2000])
+    parser.add_argument("--schemata", type=int, nargs="+", default=[0, 10, 50])
+    parser.add_argument("--fieldsets", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--max-exponent", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    setUpComponents()
+
+    print("{:>6} {:>9}  {:<34} {:>12}".format("fields", "schemata", "phase", "ms"))
+    for schemata in args.schemata:
+        for fields in args.fields:
+            times = benchmark(
+                fields, schemata, args.fieldsets, args.moves, repeat=args.repeat
+            )
+            for phase in PHASES:
+                print(
+                    "{:>6} {:>9}  {:<34} {:>12.3f}".format(
+                        fields, schemata, phase, times[phase] * 1000
+                    )
+                )
+
+    if args.check:
+        exponents = checkScaling(
+            min(args.fields),
+            max(args.fields),
+            maxExponent=args.max_exponent,
+            fieldsets=args.fieldsets,
+            moves=args.moves,
+        )
+        for phase in PHASES:
+            print(f"{phase}: O(n^{exponents[phase]:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
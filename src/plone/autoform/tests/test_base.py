@@ -2,6 +2,7 @@ from collections import OrderedDict
 from plone.testing.zca import UNIT_TESTING
 
 import unittest
+import warnings
 
 
 class TestBase(unittest.TestCase):
@@ -133,3 +134,302 @@ class TestBase(unittest.TestCase):
         autofields.request = {}
         autofields.updateFieldsFromSchemata()
         self.assertEqual(autofields.groups, [])
+
+
+class TestLayoutCache(unittest.TestCase):
+    layer = UNIT_TESTING
+
+    def setUp(self):
+        from AccessControl.SecurityManagement import getSecurityManager
+        from AccessControl.SecurityManagement import setSecurityManager
+        from plone.autoform.base import _layout_cache
+        from plone.autoform.form import AutoExtensibleForm
+        from z3c.form.form import Form
+        from zope.component import provideUtility
+        from zope.interface import Interface
+        from zope.security.permission import Permission
+
+        import zope.schema
+
+        provideUtility(Permission("foo", "foo", ""), name="foo")
+
+        class DummySecurityManager:
+            allowed = True
+            checks = []
+
+            def checkPermission(self, perm, context):
+                self.checks.append(perm)
+                return self.allowed
+
+        self.oldsecman = getSecurityManager()
+        self.secman = DummySecurityManager()
+        setSecurityManager(self.secman)
+        self.addCleanup(setSecurityManager, self.oldsecman)
+        _layout_cache.clear()
+        self.addCleanup(_layout_cache.clear)
+
+        class ISchema(Interface):
+            title = zope.schema.TextLine()
+            body = zope.schema.Text()
+            secret = zope.schema.TextLine()
+
+        class TestForm(AutoExtensibleForm, Form):
+            schema = ISchema
+
+        self.schema = ISchema
+        self.form_class = TestForm
+
+    def make_form(self):
+        return self.form_class(None, {"AUTHENTICATED_USER": "user1"})
+
+    def test_layout_is_reused(self):
+        from plone.autoform.base import _layout_cache
+        from plone.autoform.interfaces import ORDER_KEY
+
+        self.schema.setTaggedValue(ORDER_KEY, [("body", "before", "title")])
+
+        form1 = self.make_form()
+        form1.updateFieldsFromSchemata()
+        self.assertEqual(len(_layout_cache), 1)
+
+        form2 = self.make_form()
+        form2.updateFieldsFromSchemata()
+        self.assertEqual(len(_layout_cache), 1)
+        self.assertEqual(list(form1.fields.keys()), ["body", "title", "secret"])
+        self.assertEqual(list(form1.fields.keys()), list(form2.fields.keys()))
+
+        # every form gets its own, modifiable field instances
+        form2.fields["title"].mode = "hidden"
+        self.assertIsNot(form1.fields["title"], form2.fields["title"])
+        form3 = self.make_form()
+        form3.updateFieldsFromSchemata()
+        self.assertIsNone(form3.fields["title"].mode)
+
+    def test_layout_invalidated_on_tagged_value_change(self):
+        from plone.autoform.interfaces import MODES_KEY
+        from plone.autoform.interfaces import OMITTED_KEY
+        from zope.interface import Interface
+
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertIn("body", form.fields)
+
+        self.schema.setTaggedValue(OMITTED_KEY, [(Interface, "body", "true")])
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertNotIn("body", form.fields)
+
+        # in-place modifications are detected as well
+        self.schema.getTaggedValue(OMITTED_KEY).append((Interface, "title", "true"))
+        self.schema.setTaggedValue(MODES_KEY, [(Interface, "secret", "hidden")])
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertEqual(list(form.fields.keys()), ["secret"])
+        self.assertEqual(form.fields["secret"].mode, "hidden")
+
+    def test_layout_depends_on_permissions(self):
+        from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
+
+        self.schema.setTaggedValue(WRITE_PERMISSIONS_KEY, {"secret": "foo"})
+
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertIn("secret", form.fields)
+
+        self.secman.allowed = False
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertNotIn("secret", form.fields)
+        self.assertEqual(self.secman.checks[-1], "foo")
+
+        self.secman.allowed = True
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertIn("secret", form.fields)
+
+    def test_layout_shared_within_request(self):
+        from plone.autoform import base
+        from plone.autoform.interfaces import OMITTED_KEY
+        from unittest import mock
+        from zope.interface import Interface
+
+        class Request(dict):
+            pass
+
+        request = Request(AUTHENTICATED_USER="user1")
+        with mock.patch.object(
+            base, "_schemaSnapshot", wraps=base._schemaSnapshot
+        ) as snapshot:
+            for i in range(20):
+                form = self.form_class(None, request)
+                form.updateFieldsFromSchemata()
+                self.assertEqual(list(form.fields.keys()), ["title", "body", "secret"])
+            self.assertEqual(snapshot.call_count, 1)
+
+            # changes made within the request are still picked up
+            self.schema.setTaggedValue(OMITTED_KEY, [(Interface, "body", "true")])
+            form = self.form_class(None, request)
+            form.updateFieldsFromSchemata()
+            self.assertEqual(list(form.fields.keys()), ["title", "secret"])
+            self.assertEqual(snapshot.call_count, 2)
+
+    def test_layout_of_equal_schemata(self):
+        from zope.interface.interface import InterfaceClass
+
+        import zope.schema
+
+        # different schemata which compare equal, like those of unnamed models
+        schema_a = InterfaceClass("ISame", attrs={"a": zope.schema.TextLine()})
+        schema_b = InterfaceClass("ISame", attrs={"b": zope.schema.TextLine()})
+        self.assertEqual(schema_a, schema_b)
+
+        class Request(dict):
+            pass
+
+        request = Request(AUTHENTICATED_USER="user1")
+        for schema, names in ((schema_a, ["a"]), (schema_b, ["b"]), (schema_a, ["a"])):
+            form = self.form_class(None, request)
+            form.schema = schema
+            form.updateFieldsFromSchemata()
+            self.assertEqual(list(form.fields.keys()), names)
+            self.assertIs(form.fields[names[0]].field, schema[names[0]])
+
+    def test_rule_tree_overrides(self):
+        from plone.autoform.interfaces import ORDER_KEY
+
+        self.schema.setTaggedValue(ORDER_KEY, [("body", "before", "title")])
+        calls = []
+
+        class LegacyForm(self.form_class):
+            def _process_field_moves(self, rules):
+                calls.append(sorted(rules))
+                super()._process_field_moves(rules)
+
+        form = LegacyForm(None, {"AUTHENTICATED_USER": "user1"})
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            form.updateFieldsFromSchemata()
+        self.assertIn(DeprecationWarning, [w.category for w in caught])
+        self.assertIn("4.0", str(caught[0].message))
+        self.assertEqual([["title"]], calls[:1])
+        self.assertEqual(list(form.fields.keys()), ["body", "title", "secret"])
+
+    def test_layout_cache_disabled(self):
+        from plone.autoform.base import _layout_cache
+
+        self.form_class.cacheLayout = False
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+        self.assertEqual(list(form.fields.keys()), ["title", "body", "secret"])
+        self.assertEqual(len(_layout_cache), 0)
+
+
+class TestFieldOrder(unittest.TestCase):
+    layer = UNIT_TESTING
+
+    def make_form(self, names, group_names=()):
+        from plone.autoform.base import AutoFields
+        from plone.z3cform.fieldsets.group import GroupFactory
+        from z3c.form import field
+
+        import zope.schema
+
+        def fields(names):
+            return field.Fields(
+                *[field.Field(zope.schema.TextLine(__name__=name)) for name in names]
+            )
+
+        form = AutoFields()
+        form.fields = fields(names)
+        form.groups = [
+            GroupFactory(group_name, fields(group_fields))
+            for group_name, group_fields in group_names
+        ]
+        return form
+
+    def layout(self, form):
+        return [list(form.fields.keys())] + [
+            list(group.fields.keys()) for group in form.groups
+        ]
+
+    def move(self, form, order):
+        from plone.autoform.base import _FieldOrder
+        from plone.autoform.base import _solve_field_moves
+
+        moves, problems = _solve_field_moves(order)
+        field_order = _FieldOrder(form)
+        for move in moves:
+            problem = field_order.move(*move)
+            if problem is not None:
+                problems.append(problem)
+        field_order.apply()
+        return problems
+
+    def test_chain(self):
+        form = self.make_form(["a", "b", "c", "d"], [("g", ["e", "f"])])
+        problems = self.move(
+            form,
+            [
+                ("d", "after", "c"),
+                ("c", "before", "a"),
+                ("a", "after", "e"),
+                ("b", "before", "*"),
+            ],
+        )
+        self.assertEqual([], problems)
+        # moves follow the field they are relative to, even into groups
+        self.assertEqual([["b"], ["e", "c", "d", "a", "f"]], self.layout(form))
+
+    def test_problems(self):
+        from plone.autoform.base import FieldMoveProblem
+
+        form = self.make_form(["a", "b", "c", "d"])
+        problems = self.move(
+            form,
+            [
+                ("c", "after", "a"),
+                ("a", "after", "c"),
+                ("d", "before", "x"),
+                ("b", "after", "d"),
+            ],
+        )
+        # the moves in the cycle are skipped, moves relative to a field which
+        # could not be moved itself are still done
+        self.assertEqual(["a", "c", "d", "b"], list(form.fields.keys()))
+        self.assertEqual(
+            [
+                FieldMoveProblem("cycle", "c", "after", "a"),
+                FieldMoveProblem("cycle", "a", "after", "c"),
+                FieldMoveProblem("missing", "d", "before", "x"),
+            ],
+            problems,
+        )
+
+    def test_same_result_as_rule_tree(self):
+        import random
+
+        rnd = random.Random(42)
+        names = list("abcdefghijkl")
+        for _ in range(300):
+            rnd.shuffle(names)
+            form_names, group1, group2 = names[:6], names[6:9], names[9:]
+            order = []
+            for _ in range(rnd.randint(1, 12)):
+                order.append(
+                    (
+                        rnd.choice(names + ["y"]),
+                        rnd.choice(["before", "after"]),
+                        rnd.choice(names + ["*", "z"]),
+                    )
+                )
+
+            expected = self.make_form(form_names, [("g1", group1), ("g2", group2)])
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                rules = expected._calculate_field_moves(order)
+                expected._cleanup_rules(rules)
+                expected._process_field_moves(rules)
+
+            form = self.make_form(form_names, [("g1", group1), ("g2", group2)])
+            self.move(form, order)
+            self.assertEqual(self.layout(expected), self.layout(form), order)
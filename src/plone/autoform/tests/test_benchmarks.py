@@ -0,0 +1,34 @@
+from plone.autoform.testing import AUTOFORM_INTEGRATION_TESTING
+from plone.autoform.tests import benchmarks
+from plone.testing import zca
+from zope.component import provideUtility
+from zope.security.permission import Permission
+
+import unittest
+
+
+class TestScaling(unittest.TestCase):
+    """Regression gate: setting up a form must scale (about) linearly with
+    the number of fields.
+    """
+
+    layer = AUTOFORM_INTEGRATION_TESTING
+
+    def setUp(self):
+        zca.pushGlobalRegistry()
+        self.addCleanup(zca.popGlobalRegistry)
+        provideUtility(
+            Permission(benchmarks.PERMISSION, benchmarks.PERMISSION, ""),
+            name=benchmarks.PERMISSION,
+        )
+
+    def test_benchmark_phases(self):
+        times = benchmarks.benchmark(
+            fields=20, schemata=2, fieldsets=2, moves=5, repeat=1
+        )
+        self.assertEqual(set(benchmarks.PHASES), set(times))
+
+    def test_linear_in_fields(self):
+        benchmarks.checkScaling(
+            small=100, large=800, maxExponent=1.5, fieldsets=20, moves=20, repeat=3
+        )
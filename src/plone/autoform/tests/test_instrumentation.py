@@ -0,0 +1,115 @@
+from plone.testing.zca import UNIT_TESTING
+
+import unittest
+
+
+class TestInstrumentation(unittest.TestCase):
+    layer = UNIT_TESTING
+
+    def setUp(self):
+        from AccessControl.SecurityManagement import getSecurityManager
+        from AccessControl.SecurityManagement import setSecurityManager
+        from plone.autoform.base import _layout_cache
+        from plone.autoform.form import AutoExtensibleForm
+        from plone.autoform.instrumentation import addProfileSink
+        from plone.autoform.instrumentation import removeProfileSink
+        from plone.autoform.interfaces import ORDER_KEY
+        from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
+        from z3c.form.form import Form
+        from zope.component import provideUtility
+        from zope.interface import Interface
+        from zope.security.permission import Permission
+
+        import zope.schema
+
+        provideUtility(Permission("foo", "foo", ""), name="foo")
+
+        class DummySecurityManager:
+            def checkPermission(self, perm, context):
+                return True
+
+        self.oldsecman = getSecurityManager()
+        setSecurityManager(DummySecurityManager())
+        self.addCleanup(setSecurityManager, self.oldsecman)
+        _layout_cache.clear()
+        self.addCleanup(_layout_cache.clear)
+
+        class ISchema(Interface):
+            title = zope.schema.TextLine()
+            body = zope.schema.Text()
+
+        ISchema.setTaggedValue(ORDER_KEY, [("body", "before", "title")])
+        ISchema.setTaggedValue(WRITE_PERMISSIONS_KEY, {"body": "foo"})
+
+        class TestForm(AutoExtensibleForm, Form):
+            schema = ISchema
+
+        self.form_class = TestForm
+        self.profiles = []
+        addProfileSink(self.profiles.append)
+        self.addCleanup(removeProfileSink, self.profiles.append)
+
+    def make_form(self):
+        class Request(dict):
+            pass
+
+        return self.form_class(None, Request(AUTHENTICATED_USER="user1"))
+
+    def test_profile(self):
+        form = self.make_form()
+        form.updateFieldsFromSchemata()
+
+        self.assertEqual(len(self.profiles), 1)
+        profile = self.profiles[0]
+        self.assertIs(profile.form, form)
+        self.assertEqual(profile.counters["schemata"], 1)
+        self.assertEqual(profile.counters["fields"], 2)
+        self.assertEqual(profile.counters["moves"], 1)
+        self.assertEqual(profile.counters["permission_checks"], 1)
+        self.assertEqual(profile.counters["permission_cache_hits"], 1)
+        self.assertEqual(profile.counters["layout_cache_misses"], 1)
+        for phase in (
+            "merge",
+            "fields",
+            "permissions",
+            "fieldsets",
+            "widgets",
+            "moves",
+            "group_order",
+        ):
+            self.assertIn(phase, profile.timings)
+        self.assertGreaterEqual(profile.total, sum(profile.timings.values()))
+        self.assertNotIn("_plone_autoform_profile", form.__dict__)
+
+    def test_profile_cached_layout(self):
+        self.make_form().updateFieldsFromSchemata()
+        self.make_form().updateFieldsFromSchemata()
+
+        profile = self.profiles[1]
+        self.assertEqual(profile.counters["layout_cache_hits"], 1)
+        self.assertNotIn("fields", profile.counters)
+        self.assertIn("layout_cache", profile.timings)
+
+    def test_sink_errors_are_logged(self):
+        from plone.autoform.instrumentation import addProfileSink
+        from plone.autoform.instrumentation import removeProfileSink
+
+        def broken(profile):
+            raise ValueError("broken")
+
+        addProfileSink(broken)
+        self.addCleanup(removeProfileSink, broken)
+        with self.assertLogs("plone.autoform.instrumentation", "ERROR"):
+            self.make_form().updateFieldsFromSchemata()
+        self.assertEqual(len(self.profiles), 1)
+
+    def test_no_sinks(self):
+        from plone.autoform.instrumentation import beginProfile
+        from plone.autoform.instrumentation import NULL_PROFILE
+        from plone.autoform.instrumentation import removeProfileSink
+
+        removeProfileSink(self.profiles.append)
+        form = self.make_form()
+        self.assertIs(beginProfile(form), NULL_PROFILE)
+        form.updateFieldsFromSchemata()
+        self.assertEqual(self.profiles, [])
@@ -14,6 +14,7 @@ from z3c.form.interfaces import IForm
 from z3c.form.interfaces import IValidator
 from z3c.form.interfaces import IWidget
 from zope.component import getMultiAdapter
+from zope.component import queryMultiAdapter
 from zope.interface import implementer
 from zope.interface import Interface
 
@@ -112,6 +113,163 @@ class TestFormSchema(unittest.TestCase):
             IDummy.getTaggedValue(ORDER_KEY),
         )
 
+    def test_read_bumps_generation(self):
+        from plone.autoform.supermodel import bulkRead
+        from plone.autoform.utils import combinedGeneration
+        from plone.autoform.utils import schemaGeneration
+
+        field_node = etree.Element("field")
+        field_node.set(ns("mode", self.namespace), "hidden")
+
+        class IBase(Interface):
+            dummy = zope.schema.TextLine(title="dummy")
+
+        class IDummy(IBase):
+            pass
+
+        IBase.setTaggedValue(MODES_KEY, [])
+        generation = schemaGeneration(IBase)
+        combined = combinedGeneration(IDummy)
+        self.assertEqual(generation, schemaGeneration(IBase))
+
+        # modified in place, but through a writer of plone.autoform
+        FormSchema().read(field_node, IBase, IBase["dummy"])
+        self.assertNotEqual(generation, schemaGeneration(IBase))
+        self.assertNotEqual(combined, combinedGeneration(IDummy))
+
+        generation = schemaGeneration(IBase)
+        with bulkRead():
+            FormSchema().read(field_node, IBase, IBase["dummy"])
+            self.assertEqual(generation, schemaGeneration(IBase))
+        self.assertNotEqual(generation, schemaGeneration(IBase))
+
+    def test_read_validator_registered_once(self):
+        from plone.autoform.supermodel import modelValidators
+        from plone.autoform.supermodel import registeredValidators
+        from plone.autoform.tests.test_utils import TestValidator
+        from plone.supermodel import loadString
+        from zope.component import getGlobalSiteManager
+
+        model = """\
+<model xmlns="http://namespaces.plone.org/supermodel/schema"
+       xmlns:form="http://namespaces.plone.org/supermodel/form">
+  <schema>
+    <field type="zope.schema.TextLine" name="title"%s>
+      <title>Title</title>
+    </field>
+  </schema>
+</model>
+"""
+        validator = ' form:validator="plone.autoform.tests.test_utils.TestValidator"'
+
+        def validators():
+            return [
+                registration
+                for registration in getGlobalSiteManager().registeredAdapters()
+                if registration.provided is IValidator
+                and registration.factory is TestValidator
+            ]
+
+        before = len(validators())
+        schemata = []
+        for i in range(5):
+            schemata.append(loadString(model % validator, policy="").schema)
+            self.assertEqual(before + 1, len(validators()))
+        # all versions are validated
+        for schema in schemata:
+            self.assertIsInstance(
+                getMultiAdapter((None, None, None, schema["title"], None), IValidator),
+                TestValidator,
+            )
+
+        before = len(validators())
+        for i in range(3):
+            with modelValidators("title.xml"):
+                schema = loadString(model % validator, policy="").schema
+        self.assertEqual(before + 1, len(validators()))
+        self.assertEqual(
+            [("title.xml", schema.__identifier__, "title", TestValidator)],
+            [item for item in registeredValidators() if item[0] == "title.xml"],
+        )
+        self.assertIsInstance(
+            getMultiAdapter((None, None, None, schema["title"], None), IValidator),
+            TestValidator,
+        )
+
+        # a new version of the model without the validator unregisters it
+        with modelValidators("title.xml"):
+            loadString(model % "", policy="")
+        self.assertEqual(before, len(validators()))
+        self.assertNotIn("title.xml", [item[0] for item in registeredValidators()])
+
+    def test_read_validators_of_unnamed_models(self):
+        from plone.autoform.supermodel import registeredValidators
+        from plone.autoform.tests.test_utils import TestValidator
+        from plone.supermodel import loadString
+
+        model = """\
+<model xmlns="http://namespaces.plone.org/supermodel/schema"
+       xmlns:form="http://namespaces.plone.org/supermodel/form">
+  <schema>
+    <field type="zope.schema.TextLine" name="%s"%s>
+      <title>Title</title>
+    </field>
+  </schema>
+</model>
+"""
+        validator = ' form:validator="plone.autoform.tests.test_utils.TestValidator"'
+        schema_a = loadString(model % ("title", validator), policy="").schema
+        schema_b = loadString(model % ("title", ""), policy="").schema
+        schema_c = loadString(model % ("description", validator), policy="").schema
+        # all unnamed schemata share the same identifier
+        self.assertEqual(schema_a.__identifier__, schema_b.__identifier__)
+
+        for schema, name in ((schema_a, "title"), (schema_c, "description")):
+            self.assertIsInstance(
+                getMultiAdapter((None, None, None, schema[name], None), IValidator),
+                TestValidator,
+            )
+        self.assertNotIsInstance(
+            queryMultiAdapter((None, None, None, schema_b["title"], None), IValidator),
+            TestValidator,
+        )
+        self.assertEqual(
+            [
+                (None, schema_a.__identifier__, "description", TestValidator),
+                (None, schema_a.__identifier__, "title", TestValidator),
+            ],
+            [
+                item
+                for item in registeredValidators()
+                if item[1] == schema_a.__identifier__
+            ],
+        )
+
+    def test_read_widget_attribute_round_trip(self):
+        from plone.supermodel import loadString
+        from plone.supermodel import serializeModel
+
+        model = loadString(
+            """\
+<model xmlns="http://namespaces.plone.org/supermodel/schema"
+       xmlns:form="http://namespaces.plone.org/supermodel/form">
+  <schema>
+    <field type="zope.schema.Text" name="body"
+           form:widget="z3c.form.browser.textarea.TextAreaFieldWidget">
+      <title>Body</title>
+    </field>
+  </schema>
+</model>
+""",
+            policy="",
+        )
+        widgets = model.schema.queryTaggedValue(WIDGETS_KEY)
+        self.assertIs(str, type(widgets["body"]))
+        self.assertIn(
+            '<form:widget type="z3c.form.browser.textarea.TextAreaFieldWidget"/>',
+            serializeModel(model),
+        )
+
     def test_read_no_data(self):
         field_node = etree.Element("field")
 
@@ -162,6 +320,58 @@ class TestFormSchema(unittest.TestCase):
         ]
         self.assertEqual(expected_omitted, IDummy.queryTaggedValue(OMITTED_KEY))
 
+    def test_read_bulk(self):
+        from plone.autoform.supermodel import bulkRead
+        from plone.autoform.supermodel import SchemaValuesHandler
+
+        field_node1 = etree.Element("field")
+        field_node1.set(ns("mode", self.namespace), "z3c.form.interfaces.IForm:hidden")
+        field_node1.set(ns("before", self.namespace), "dummy2")
+        field_node1.set(
+            ns("widget", self.namespace),
+            "z3c.form.browser.password.PasswordFieldWidget",
+        )
+
+        field_node2 = etree.Element("field")
+        field_node2.set(ns("mode", self.namespace), "z3c.form.interfaces.IForm:input")
+        field_node2.set(ns("omitted", self.namespace), "true")
+
+        class IDummy(Interface):
+            dummy1 = zope.schema.TextLine(title="dummy1")
+            dummy2 = zope.schema.TextLine(title="dummy2")
+
+        class IOther(Interface):
+            other = zope.schema.TextLine(title="other")
+
+        handler = FormSchema()
+        with bulkRead():
+            handler.read(field_node1, IDummy, IDummy["dummy1"])
+            handler.read(field_node2, IDummy, IDummy["dummy2"])
+            handler.read(field_node2, IOther, IOther["other"])
+            self.assertIsNone(IDummy.queryTaggedValue(MODES_KEY))
+
+            SchemaValuesHandler().read(None, IDummy)
+            self.assertEqual(
+                [(IForm, "dummy1", "hidden"), (IForm, "dummy2", "input")],
+                IDummy.queryTaggedValue(MODES_KEY),
+            )
+            self.assertEqual(
+                [(Interface, "dummy2", "true")], IDummy.queryTaggedValue(OMITTED_KEY)
+            )
+            self.assertEqual(
+                [("dummy1", "before", "dummy2")], IDummy.queryTaggedValue(ORDER_KEY)
+            )
+            self.assertEqual(
+                {"dummy1": "z3c.form.browser.password.PasswordFieldWidget"},
+                IDummy.queryTaggedValue(WIDGETS_KEY),
+            )
+            self.assertIsNone(IOther.queryTaggedValue(MODES_KEY))
+
+        # left over values are set at the end
+        self.assertEqual(
+            [(IForm, "other", "input")], IOther.queryTaggedValue(MODES_KEY)
+        )
+
     def test_read_parameterized_widget(self):
         from plone.autoform.widgets import ParameterizedWidget
 
@@ -236,6 +446,126 @@ class TestFormSchema(unittest.TestCase):
         self.assertEqual("hidden", field_node.get(ns("mode", self.namespace)))
         self.assertEqual("somefield", field_node.get(ns("before", self.namespace)))
 
+    def test_write_index(self):
+        from plone.autoform.supermodel import _export
+        from plone.autoform.supermodel import SchemaValuesHandler
+
+        class IDummy(Interface):
+            dummy1 = zope.schema.TextLine(title="dummy1")
+            dummy2 = zope.schema.TextLine(title="dummy2")
+
+        IDummy.setTaggedValue(
+            MODES_KEY,
+            [
+                (Interface, "dummy1", "hidden"),
+                (IForm, "dummy2", "display"),
+                (IEditForm, "dummy1", "input"),
+            ],
+        )
+        IDummy.setTaggedValue(ORDER_KEY, [("dummy2", "after", "dummy1")])
+
+        handler = FormSchema()
+        schema_node = etree.Element("schema")
+        field_node1 = etree.SubElement(schema_node, "field")
+        handler.write(field_node1, IDummy, IDummy["dummy1"])
+        index = _export.index[2]
+        field_node2 = etree.SubElement(schema_node, "field")
+        handler.write(field_node2, IDummy, IDummy["dummy2"])
+        self.assertIs(index, _export.index[2])
+        # fieldset elements are attached after their fields are written
+        field_node3 = etree.SubElement(etree.Element("fieldset"), "field")
+        handler.write(field_node3, IDummy, IDummy["dummy2"])
+        self.assertIs(index, _export.index[2])
+
+        self.assertEqual(
+            "hidden z3c.form.interfaces.IEditForm:input",
+            field_node1.get(ns("mode", self.namespace)),
+        )
+        self.assertIsNone(field_node1.get(ns("after", self.namespace)))
+        self.assertEqual(
+            "z3c.form.interfaces.IForm:display",
+            field_node2.get(ns("mode", self.namespace)),
+        )
+        self.assertEqual("dummy1", field_node2.get(ns("after", self.namespace)))
+
+        # the index is dropped once the schema has been written
+        SchemaValuesHandler().write(schema_node, IDummy)
+        self.assertIsNone(_export.index)
+
+        # a new export notices tagged values changed in place
+        IDummy.getTaggedValue(MODES_KEY)[0] = (Interface, "dummy1", "display")
+        field_node1 = etree.SubElement(etree.Element("schema"), "field")
+        handler.write(field_node1, IDummy, IDummy["dummy1"])
+        self.assertEqual(
+            "display z3c.form.interfaces.IEditForm:input",
+            field_node1.get(ns("mode", self.namespace)),
+        )
+
+        # field nodes without a parent do not use the index
+        IDummy.getTaggedValue(MODES_KEY)[0] = (Interface, "dummy1", "hidden")
+        field_node1 = etree.Element("field")
+        handler.write(field_node1, IDummy, IDummy["dummy1"])
+        self.assertEqual(
+            "hidden z3c.form.interfaces.IEditForm:input",
+            field_node1.get(ns("mode", self.namespace)),
+        )
+        field_node1 = etree.Element("field")
+        IDummy.getTaggedValue(MODES_KEY)[0] = (Interface, "dummy1", "display")
+        handler.write(field_node1, IDummy, IDummy["dummy1"])
+        self.assertEqual(
+            "display z3c.form.interfaces.IEditForm:input",
+            field_node1.get(ns("mode", self.namespace)),
+        )
+
+    def test_write_index_once_per_serialization(self):
+        from plone.autoform import supermodel
+        from plone.supermodel import loadString
+        from plone.supermodel import serializeModel
+
+        model = loadString(
+            """\
+<model xmlns="http://namespaces.plone.org/supermodel/schema"
+       xmlns:form="http://namespaces.plone.org/supermodel/form">
+  <schema>
+    <field type="zope.schema.TextLine" name="title" form:mode="hidden">
+      <title>Title</title>
+    </field>
+    <fieldset name="one" label="One">
+      <field type="zope.schema.TextLine" name="first" form:mode="display">
+        <title>First</title>
+      </field>
+    </fieldset>
+    <fieldset name="two" label="Two">
+      <field type="zope.schema.TextLine" name="second" form:omitted="true">
+        <title>Second</title>
+      </field>
+    </fieldset>
+  </schema>
+</model>
+""",
+            policy="",
+        )
+        schema = model.schema
+        builds = []
+        queryTaggedValue = schema.queryTaggedValue
+
+        def countingQuery(key, default=None):
+            if key == MODES_KEY:
+                builds.append(key)
+            return queryTaggedValue(key, default)
+
+        schema.queryTaggedValue = countingQuery
+        try:
+            xml = serializeModel(model)
+            self.assertEqual(1, len(builds))
+            serializeModel(model)
+            self.assertEqual(2, len(builds))
+        finally:
+            del schema.queryTaggedValue
+        self.assertIsNone(supermodel._export.index)
+        self.assertIn('form:mode="display"', xml)
+        self.assertIn('form:omitted="true"', xml)
+
     def test_write_partial(self):
         field_node = etree.Element("field")
 
@@ -420,6 +750,28 @@ class TestSecuritySchema(unittest.TestCase):
             {"dummy": "dummy.Write"}, IDummy.getTaggedValue(WRITE_PERMISSIONS_KEY)
         )
 
+    def test_read_bulk(self):
+        from plone.autoform.supermodel import bulkRead
+
+        field_node = etree.Element("field")
+        field_node.set(ns("read-permission", self.namespace), "dummy.Read")
+        field_node.set(ns("write-permission", self.namespace), "dummy.Write")
+
+        class IDummy(Interface):
+            dummy = zope.schema.TextLine(title="dummy")
+
+        handler = SecuritySchema()
+        with bulkRead():
+            handler.read(field_node, IDummy, IDummy["dummy"])
+            self.assertIsNone(IDummy.queryTaggedValue(READ_PERMISSIONS_KEY))
+
+        self.assertEqual(
+            {"dummy": "dummy.Read"}, IDummy.getTaggedValue(READ_PERMISSIONS_KEY)
+        )
+        self.assertEqual(
+            {"dummy": "dummy.Write"}, IDummy.getTaggedValue(WRITE_PERMISSIONS_KEY)
+        )
+
     def test_read_no_permissions(self):
         field_node = etree.Element("field")
 
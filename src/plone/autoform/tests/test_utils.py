@@ -10,6 +10,7 @@ from z3c.form.validator import SimpleFieldValidator
 from zope.component import provideUtility
 from zope.interface import Interface
 from zope.interface import Invalid
+from zope.interface import providedBy
 
 import unittest
 import zope.schema
@@ -30,7 +31,8 @@ class TestUtils(unittest.TestCase):
         provideUtility(Permission("foo", "foo", ""), name="foo")
 
         class DummySecurityManager:
-            checks = []
+            def __init__(self):
+                self.checks = []
 
             def checkPermission(self, perm, context):
                 self.checks.append(perm)
@@ -69,6 +71,154 @@ class TestUtils(unittest.TestCase):
         self.assertEqual("foo", self.secman.checks.pop())
         self.assertFalse("prefix.title" in form.fields)
 
+    def test_processFields_permission_decisions_shared_per_request(self):
+        from plone.autoform.utils import getPermissionDecisions
+
+        class Request(dict):
+            pass
+
+        request = Request()
+        form = Form(None, request)
+        form.groups = ()
+
+        class schema(Interface):
+            title = zope.schema.TextLine()
+
+        class other(Interface):
+            body = zope.schema.TextLine()
+
+        schema.setTaggedValue(WRITE_PERMISSIONS_KEY, {"title": "foo"})
+        other.setTaggedValue(WRITE_PERMISSIONS_KEY, {"body": "foo"})
+        processFields(form, schema, prefix="", permissionChecks=True)
+        processFields(form, other, prefix="other", permissionChecks=True)
+
+        self.assertEqual(["foo"], self.secman.checks)
+        self.assertEqual([], list(form.fields.keys()))
+        decisions = getPermissionDecisions(request)
+        self.assertEqual(1, decisions.misses)
+        self.assertEqual(1, decisions.hits)
+
+        # a different context is checked again
+        form = Form(object(), request)
+        form.groups = ()
+        processFields(form, schema, prefix="", permissionChecks=True)
+        self.assertEqual(["foo", "foo"], self.secman.checks)
+        self.assertEqual(2, decisions.misses)
+
+    def test_permission_decision_cache(self):
+        from plone.autoform.utils import PermissionDecisionCache
+        from plone.autoform.utils import setPermissionDecisionCache
+
+        class Context:
+            def __init__(self, roles):
+                self.roles = roles
+
+        def signature(context, securityManager):
+            return context.roles
+
+        cache = PermissionDecisionCache(signature, maxsize=2)
+        self.assertIsNone(setPermissionDecisionCache(cache))
+        self.addCleanup(setPermissionDecisionCache, None)
+
+        class schema(Interface):
+            title = zope.schema.TextLine()
+
+        schema.setTaggedValue(WRITE_PERMISSIONS_KEY, {"title": "foo"})
+
+        def process(context):
+            # a new request every time
+            form = Form(context, {})
+            form.groups = ()
+            processFields(form, schema, prefix="", permissionChecks=True)
+            return list(form.fields.keys())
+
+        self.assertEqual([], process(Context("Member")))
+        self.assertEqual([], process(Context("Member")))
+        self.assertEqual(["foo"], self.secman.checks)
+        self.assertEqual(
+            {"hits": 1, "misses": 1, "uncached": 0, "size": 1}, cache.stats()
+        )
+
+        # another signature is checked again
+        process(Context("Manager"))
+        self.assertEqual(["foo", "foo"], self.secman.checks)
+        process(Context(None))
+        process(Context(None))
+        self.assertEqual(4, len(self.secman.checks))
+        self.assertEqual(2, cache.stats()["uncached"])
+
+        process(Context("Reviewer"))
+        self.assertEqual(2, len(cache))
+
+        # registering a permission invalidates the cache
+        from plone.autoform.utils import permissionRegistrationChanged
+        from zope.interface.interfaces import Registered
+        from zope.interface.registry import UtilityRegistration
+        from zope.security.interfaces import IPermission
+        from zope.security.permission import Permission
+
+        permission = Permission("foo", "bar", "")
+        provideUtility(permission, name="foo")
+        permissionRegistrationChanged(
+            Registered(
+                UtilityRegistration(None, IPermission, "foo", permission, None, "")
+            )
+        )
+        self.assertEqual(0, len(cache))
+        process(Context("Member"))
+        self.assertEqual("bar", self.secman.checks[-1])
+
+    def test_permission_title_not_found(self):
+        from plone.autoform.utils import permissionTitle
+        from zope.security.permission import Permission
+
+        self.assertIsNone(permissionTitle("bar"))
+        # registered without events
+        provideUtility(Permission("bar", "Bar", ""), name="bar")
+        self.assertEqual("Bar", permissionTitle("bar"))
+
+        class schema(Interface):
+            title = zope.schema.TextLine()
+
+        schema.setTaggedValue(WRITE_PERMISSIONS_KEY, {"title": "bar"})
+        form = Form(None, {})
+        form.groups = ()
+        processFields(form, schema, prefix="", permissionChecks=True)
+        self.assertEqual(["Bar"], self.secman.checks)
+        self.assertEqual([], list(form.fields.keys()))
+
+    def test_processFields_field_templates(self):
+        from plone.autoform.interfaces import MODES_KEY
+        from plone.autoform.utils import _fieldTemplateCache
+
+        _fieldTemplateCache.clear()
+
+        class schema(Interface):
+            title = zope.schema.TextLine()
+            body = zope.schema.Text()
+
+        schema.setTaggedValue(MODES_KEY, [(Interface, "title", "hidden")])
+
+        form1 = Form(None, None)
+        form1.groups = ()
+        processFields(form1, schema, permissionChecks=False)
+        form2 = Form(None, None)
+        form2.groups = ()
+        processFields(form2, schema, permissionChecks=False)
+
+        self.assertEqual(1, len(_fieldTemplateCache))
+        self.assertIsNot(form1.fields["title"], form2.fields["title"])
+        self.assertEqual("hidden", form2.fields["title"].mode)
+        templates = list(_fieldTemplateCache.values())[0][1]
+        self.assertIsNone(templates["title"].mode)
+
+        # fields changed in place are noticed
+        schema["body"].order = schema["title"].order - 1
+        form3 = Form(None, None)
+        form3.groups = ()
+        processFields(form3, schema, permissionChecks=False)
+        self.assertEqual(["body", "title"], list(form3.fields.keys()))
+
     def test_processFields_fieldsets_as_form_groups(self):
         form = Form(None, None)
         form.groups = []
@@ -129,3 +279,313 @@ class TestUtils(unittest.TestCase):
 
         self.assertEqual(form.groups[1].__name__, "fs2")
         self.assertEqual(form.groups[1].order, 1)
+
+    def test_processFields_fieldset_partitioning(self):
+        form = Form(None, None)
+        form.groups = []
+
+        class schema(Interface):
+            one = zope.schema.TextLine()
+            two = zope.schema.TextLine()
+            three = zope.schema.TextLine()
+            four = zope.schema.TextLine()
+
+        schema.setTaggedValue(
+            FIELDSETS_KEY,
+            [
+                Fieldset("fs1", fields=["three", "missing", "one"]),
+                Fieldset("fs2", fields=["one"]),
+            ],
+        )
+        processFields(form, schema, prefix="prefix", permissionChecks=False)
+
+        self.assertEqual(["prefix.two", "prefix.four"], list(form.fields.keys()))
+        self.assertEqual(
+            [["prefix.three", "prefix.one"], ["prefix.one"]],
+            [list(group.fields.keys()) for group in form.groups],
+        )
+
+
+class TestMergedTaggedValues(unittest.TestCase):
+    layer = UNIT_TESTING
+
+    def test_mergedTaggedValuesForIRO(self):
+        from plone.autoform.interfaces import MODES_KEY
+        from plone.autoform.utils import mergedTaggedValuesForIRO
+        from z3c.form.interfaces import IEditForm
+        from z3c.form.interfaces import IForm
+
+        class schema(Interface):
+            title = zope.schema.TextLine()
+
+        schema.setTaggedValue(
+            MODES_KEY,
+            [
+                (IForm, "title", "hidden"),
+                (Interface, "title", "display"),
+                (IEditForm, "title", "input"),
+            ],
+        )
+        self.assertEqual(
+            {"title": "hidden"},
+            mergedTaggedValuesForIRO(schema, MODES_KEY, [IForm, Interface]),
+        )
+        self.assertEqual(
+            {"title": "input"},
+            mergedTaggedValuesForIRO(schema, MODES_KEY, [IEditForm, IForm, Interface]),
+        )
+        self.assertEqual({}, mergedTaggedValuesForIRO(schema, MODES_KEY, []))
+
+    def test_mergedTaggedValuesForForm_cached(self):
+        from plone.autoform.interfaces import OMITTED_KEY
+        from plone.autoform.utils import _mergedForFormCache
+        from plone.autoform.utils import mergedTaggedValuesForForm
+        from z3c.form.interfaces import IForm
+
+        class base(Interface):
+            title = zope.schema.TextLine()
+
+        class schema(base):
+            body = zope.schema.TextLine()
+
+        base.setTaggedValue(OMITTED_KEY, [(IForm, "title", "true")])
+        form = Form(None, None)
+
+        omitted = mergedTaggedValuesForForm(schema, OMITTED_KEY, form)
+        self.assertEqual({"title": "true"}, omitted)
+        self.assertIn((schema, OMITTED_KEY, providedBy(form)), _mergedForFormCache)
+
+        # the result is a copy
+        omitted["body"] = "true"
+        self.assertEqual(
+            {"title": "true"}, mergedTaggedValuesForForm(schema, OMITTED_KEY, form)
+        )
+
+        # changes on the schema or its bases invalidate the cache
+        schema.setTaggedValue(OMITTED_KEY, [(Interface, "body", "true")])
+        base.getTaggedValue(OMITTED_KEY).append((Interface, "title", "false"))
+        self.assertEqual(
+            {"title": "true", "body": "true"},
+            mergedTaggedValuesForForm(schema, OMITTED_KEY, form),
+        )
+        base.setTaggedValue(OMITTED_KEY, [])
+        self.assertEqual(
+            {"body": "true"}, mergedTaggedValuesForForm(schema, OMITTED_KEY, form)
+        )
+
+
+class TestDottedNameCache(unittest.TestCase):
+    def test_resolve(self):
+        from plone.autoform.utils import DottedNameCache
+        from z3c.form.browser.text import TextFieldWidget
+
+        cache = DottedNameCache()
+        name = "z3c.form.browser.text.TextFieldWidget"
+        self.assertIs(TextFieldWidget, cache.resolve(name))
+        self.assertIs(TextFieldWidget, cache.resolve(name))
+        self.assertIn(name, cache)
+        self.assertEqual(
+            {"hits": 1, "misses": 1, "failureHits": 0, "size": 1, "failures": 0},
+            cache.stats(),
+        )
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.stats()["hits"])
+
+    def test_failures_are_cached(self):
+        from plone.autoform.utils import DottedNameCache
+
+        import time
+
+        cache = DottedNameCache(failureTTL=60)
+        name = "plone.autoform.tests.missing.Widget"
+        for i in range(3):
+            with self.assertRaises(ImportError):
+                cache.resolve(name)
+        self.assertEqual(1, cache.stats()["misses"])
+        self.assertEqual(2, cache.stats()["failureHits"])
+
+        # expired failures are retried
+        expires, error = cache._failures[name]
+        cache._failures[name] = (time.monotonic() - 1, error)
+        with self.assertRaises(ImportError):
+            cache.resolve(name)
+        self.assertEqual(2, cache.stats()["misses"])
+
+        cache = DottedNameCache(failureTTL=0)
+        for i in range(2):
+            with self.assertRaises(ImportError):
+                cache.resolve(name)
+        self.assertEqual(2, cache.stats()["misses"])
+
+    def test_maxsize(self):
+        from plone.autoform.utils import DottedNameCache
+
+        cache = DottedNameCache(maxsize=2)
+        cache.resolve("z3c.form.browser.text.TextFieldWidget")
+        cache.resolve("z3c.form.browser.textarea.TextAreaFieldWidget")
+        cache.resolve("z3c.form.browser.password.PasswordFieldWidget")
+        self.assertEqual(2, len(cache))
+        self.assertNotIn("z3c.form.browser.text.TextFieldWidget", cache)
+
+
+class TestHints(unittest.TestCase):
+    def test_hints(self):
+        from plone.autoform.directives import omitted
+        from plone.autoform.directives import order_before
+        from plone.autoform.utils import FieldHint
+        from plone.autoform.utils import OrderHint
+
+        import pickle
+
+        name = "".join(["ti", "tle"])
+        (hint,) = omitted.factory(omitted, name)
+        self.assertIsInstance(hint, FieldHint)
+        self.assertEqual((Interface, "title", "true"), hint)
+        self.assertEqual("title", hint.field)
+        self.assertIs(hint.field, "title")
+        self.assertEqual(
+            "(<InterfaceClass zope.interface.Interface>, 'title', 'true')", repr(hint)
+        )
+        self.assertIs(tuple, type(pickle.loads(pickle.dumps(hint))))
+
+        (hint,) = order_before.factory(order_before, title="body")
+        self.assertIsInstance(hint, OrderHint)
+        self.assertEqual(("title", "before", "body"), hint)
+        self.assertEqual("body", hint.target)
+
+
+class TestGenerations(unittest.TestCase):
+    def test_schemaGeneration(self):
+        from plone.autoform.interfaces import OMITTED_KEY
+        from plone.autoform.utils import bumpGeneration
+        from plone.autoform.utils import combinedGeneration
+        from plone.autoform.utils import schemaGeneration
+
+        class IBase(Interface):
+            title = zope.schema.TextLine()
+
+        class ISchema(IBase):
+            body = zope.schema.Text()
+
+        stamps = [combinedGeneration(ISchema)]
+        self.assertEqual(stamps[0], combinedGeneration(ISchema))
+
+        bumpGeneration(ISchema)
+        stamps.append(combinedGeneration(ISchema))
+        IBase.setTaggedValue(OMITTED_KEY, [(Interface, "title", "true")])
+        stamps.append(combinedGeneration(ISchema))
+        IBase.queryTaggedValue(OMITTED_KEY).append((Interface, "title", "false"))
+        stamps.append(combinedGeneration(ISchema))
+        IBase.setTaggedValue(OMITTED_KEY, list(IBase.queryTaggedValue(OMITTED_KEY)))
+        stamps.append(combinedGeneration(ISchema))
+        self.assertEqual(len(set(stamps)), 5)
+        self.assertEqual(stamps[-1], combinedGeneration(ISchema))
+        self.assertEqual(combinedGeneration(ISchema)[1], schemaGeneration(IBase))
+
+    def test_schemaGeneration_state(self):
+        from plone.autoform.interfaces import OMITTED_KEY
+        from plone.autoform.utils import _generations
+        from plone.autoform.utils import combinedGeneration
+
+        import gc
+
+        class ISchema(Interface):
+            title = zope.schema.TextLine()
+
+        ISchema.setTaggedValue(OMITTED_KEY, [(Interface, "title", "true")])
+        combinedGeneration(ISchema)
+        # only schemata with form hints are recorded, and nothing is set on them
+        self.assertIn(id(ISchema), _generations)
+        self.assertNotIn(id(Interface), _generations)
+        self.assertNotIn("_plone_autoform_generation", ISchema.__dict__)
+
+        key = id(ISchema)
+        del ISchema
+        gc.collect()
+        self.assertNotIn(key, _generations)
+
+
+class TestLayoutFingerprint(unittest.TestCase):
+    def test_layoutFingerprint(self):
+        from plone.autoform.interfaces import MODES_KEY
+        from plone.autoform.interfaces import WIDGETS_KEY
+        from plone.autoform.utils import layoutFingerprint
+        from plone.autoform.widgets import ParameterizedWidget
+        from z3c.form.interfaces import IForm
+
+        class IBase(Interface):
+            title = zope.schema.TextLine()
+
+        class ISchema(IBase):
+            body = zope.schema.Text()
+
+        class IOther(Interface):
+            summary = zope.schema.Text()
+
+        fingerprint = layoutFingerprint([ISchema])
+        self.assertEqual(len(fingerprint), 40)
+        self.assertEqual(fingerprint, layoutFingerprint([ISchema]))
+        self.assertNotEqual(fingerprint, layoutFingerprint([ISchema, IOther]))
+        self.assertNotEqual(
+            layoutFingerprint([ISchema, IOther]),
+            layoutFingerprint([ISchema, IOther], {IOther: "IOther"}),
+        )
+
+        fingerprints = {fingerprint}
+        IBase.setTaggedValue(MODES_KEY, [(IForm, "title", "display")])
+        fingerprints.add(layoutFingerprint([ISchema]))
+        widget = ParameterizedWidget(None, klass="small")
+        ISchema.setTaggedValue(WIDGETS_KEY, {"body": widget})
+        fingerprints.add(layoutFingerprint([ISchema]))
+        widget.params["klass"] = "large"
+        fingerprints.add(layoutFingerprint([ISchema]))
+        ISchema.setTaggedValue(
+            FIELDSETS_KEY, [Fieldset("extra", label="Extra", fields=["body"])]
+        )
+        fingerprints.add(layoutFingerprint([ISchema]))
+        ISchema.queryTaggedValue(FIELDSETS_KEY)[0].fields.append("title")
+        fingerprints.add(layoutFingerprint([ISchema]))
+        self.assertEqual(len(fingerprints), 6)
+
+        # the same contents give the same fingerprint
+        class ISchema(IBase):  # noqa: F811
+            body = zope.schema.Text()
+
+        ISchema.setTaggedValue(WIDGETS_KEY, {"body": widget})
+        ISchema.setTaggedValue(
+            FIELDSETS_KEY, [Fieldset("extra", label="Extra", fields=["body", "title"])]
+        )
+        self.assertIn(layoutFingerprint([ISchema]), fingerprints)
+
+        # a field of another type changes it
+        class ISchema(IBase):  # noqa: F811
+            body = zope.schema.TextLine()
+
+        ISchema.setTaggedValue(WIDGETS_KEY, {"body": widget})
+        ISchema.setTaggedValue(
+            FIELDSETS_KEY, [Fieldset("extra", label="Extra", fields=["body", "title"])]
+        )
+        self.assertNotIn(layoutFingerprint([ISchema]), fingerprints)
+
+    def test_form_layoutFingerprint(self):
+        from plone.autoform.form import AutoExtensibleForm
+        from plone.autoform.utils import layoutFingerprint
+
+        class ISchema(Interface):
+            title = zope.schema.TextLine()
+
+        class IBehavior(Interface):
+            body = zope.schema.Text()
+
+        class TestForm(AutoExtensibleForm, Form):
+            schema = ISchema
+            additionalSchemata = (IBehavior,)
+
+        form = TestForm(None, {})
+        self.assertEqual(
+            form.layoutFingerprint(),
+            layoutFingerprint([ISchema, IBehavior], {IBehavior: "IBehavior"}),
+        )
+        self.assertEqual(len(form.fields), 0)
@@ -0,0 +1,133 @@
+from plone.testing.zca import UNIT_TESTING
+
+import unittest
+
+
+class TestPrewarmWidgets(unittest.TestCase):
+    layer = UNIT_TESTING
+
+    def test_prewarm_widgets(self):
+        from plone.autoform import directives
+        from plone.autoform.interfaces import IFormFieldProvider
+        from plone.autoform.interfaces import WIDGETS_KEY
+        from plone.autoform.utils import _dottedCache
+        from plone.autoform.warmup import formSchemata
+        from plone.autoform.warmup import prewarmWidgets
+        from plone.autoform.widgets import ParameterizedWidget
+        from plone.supermodel import model
+        from z3c.form.browser.password import PasswordFieldWidget
+        from z3c.form.browser.textarea import TextAreaFieldWidget
+        from zope.component import provideUtility
+        from zope.interface import alsoProvides
+
+        import zope.schema
+
+        _dottedCache.clear()
+
+        class IBase(model.Schema):
+            directives.widget(base="z3c.form.browser.textarea.TextAreaFieldWidget")
+            base = zope.schema.Text()
+
+        class ISchema(IBase):
+            directives.widget(one=PasswordFieldWidget)
+            one = zope.schema.TextLine()
+            directives.widget("two", TextAreaFieldWidget, rows=3)
+            two = zope.schema.Text()
+
+        ISchema.setTaggedValue(
+            WIDGETS_KEY,
+            dict(
+                ISchema.queryDirectTaggedValue(WIDGETS_KEY),
+                three="z3c.form.browser.missing.MissingWidget",
+            ),
+        )
+        alsoProvides(ISchema, IFormFieldProvider)
+        provideUtility(ISchema, IFormFieldProvider, name="test.schema")
+        self.assertIn(ISchema, formSchemata())
+
+        widgets = ISchema.queryDirectTaggedValue(WIDGETS_KEY)
+        self.assertEqual(
+            "z3c.form.browser.password.PasswordFieldWidget", widgets["one"]
+        )
+        # dotted names are stored as plain strings, classes are remembered
+        self.assertIs(str, type(widgets["one"]))
+        self.assertIn(widgets["one"], _dottedCache)
+        self.assertNotIn(
+            IBase.queryDirectTaggedValue(WIDGETS_KEY)["base"], _dottedCache
+        )
+
+        with self.assertLogs("plone.autoform.warmup", "WARNING"):
+            # base and two, one was resolved already and three is missing
+            self.assertEqual(2, prewarmWidgets())
+
+        self.assertIs(
+            TextAreaFieldWidget,
+            _dottedCache.resolve(IBase.queryDirectTaggedValue(WIDGETS_KEY)["base"]),
+        )
+        self.assertTrue(isinstance(widgets["two"], ParameterizedWidget))
+        self.assertIsNotNone(widgets["two"]._compiled)
+        self.assertNotIn(widgets["three"], _dottedCache)
+
+
+class TestWarmUp(unittest.TestCase):
+    layer = UNIT_TESTING
+
+    def test_warm_up(self):
+        from plone.autoform.base import _layout_cache
+        from plone.autoform.form import AutoExtensibleForm
+        from plone.autoform.interfaces import WIDGETS_KEY
+        from plone.autoform.utils import _dottedCache
+        from plone.autoform.warmup import formClasses
+        from plone.autoform.warmup import warmUp
+        from plone.z3cform.layout import wrap_form
+        from z3c.form.form import Form
+        from zope.component import provideAdapter
+        from zope.interface import Interface
+        from zope.publisher.interfaces.browser import IBrowserRequest
+
+        import zope.schema
+
+        _layout_cache.clear()
+        self.addCleanup(_layout_cache.clear)
+        _dottedCache.clear()
+
+        class ISchema(Interface):
+            title = zope.schema.TextLine()
+
+        ISchema.setTaggedValue(
+            WIDGETS_KEY, {"title": "z3c.form.browser.textarea.TextAreaFieldWidget"}
+        )
+
+        class TestForm(AutoExtensibleForm, Form):
+            schema = ISchema
+            ignoreContext = True
+
+        class BrokenForm(AutoExtensibleForm, Form):
+            @property
+            def schema(self):
+                return self.context.schema
+
+        provideAdapter(
+            wrap_form(TestForm),
+            (Interface, IBrowserRequest),
+            Interface,
+            name="test-form",
+        )
+        provideAdapter(
+            BrokenForm, (Interface, IBrowserRequest), Interface, name="broken-form"
+        )
+        self.assertEqual([TestForm, BrokenForm], formClasses()[-2:])
+
+        report = warmUp(forms=[TestForm, BrokenForm], schemata=[])
+        self.assertEqual(
+            {"schemata": 1, "widgets": 1, "forms": 1, "failed": 1, "layouts": 1},
+            report,
+        )
+        self.assertIn(
+            ISchema.queryDirectTaggedValue(WIDGETS_KEY)["title"], _dottedCache
+        )
+
+        # already warm
+        report = warmUp(forms=[TestForm], schemata=[])
+        self.assertEqual(0, report["widgets"])
+        self.assertEqual(0, report["layouts"])
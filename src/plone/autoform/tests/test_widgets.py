@@ -67,3 +67,149 @@ class TestParameterizedWidget(unittest.TestCase):
             pass
         else:
             self.fail("Expected TypeError")
+
+    def test_widget_factory_compiled_once(self):
+        from plone.autoform.widgets import ParameterizedWidget
+        from z3c.form.interfaces import IWidget
+        from zope.interface import implementer
+        from zope.schema import Field
+
+        import pickle
+        import unittest.mock
+
+        @implementer(IWidget)
+        class DummyWidget:
+            def __init__(self, request):
+                self.request = request
+
+        field = Field(__name__="foo")
+        widget_factory = ParameterizedWidget(
+            "z3c.form.browser.textarea.TextAreaFieldWidget", rows=3
+        )
+        compiled = widget_factory._compile()
+        with unittest.mock.patch.object(
+            ParameterizedWidget, "_compile", side_effect=AssertionError
+        ):  # must not compile again
+            widget = widget_factory(field, object())
+        self.assertEqual(3, widget.rows)
+        self.assertIs(compiled, widget_factory._compiled)
+        self.assertEqual(
+            "z3c.form.browser.textarea.TextAreaFieldWidget",
+            widget_factory.widget_factory,
+        )
+
+        # assigning a different factory is picked up
+        widget_factory.widget_factory = DummyWidget
+        widget = widget_factory(field, object())
+        self.assertTrue(isinstance(widget, DummyWidget))
+
+        copy = pickle.loads(pickle.dumps(ParameterizedWidget(None, rows=3)))
+        self.assertIsNone(copy._compiled)
+        self.assertEqual({"rows": 3}, copy.params)
+
+    def test_slots(self):
+        from plone.autoform.widgets import ParameterizedWidget
+
+        import copy
+
+        widget_factory = ParameterizedWidget(None, rows=3)
+        self.assertFalse(hasattr(widget_factory, "__dict__"))
+        with self.assertRaises(AttributeError):
+            widget_factory.foo = 1
+
+        # state pickled by earlier versions is a dict
+        restored = ParameterizedWidget.__new__(ParameterizedWidget)
+        restored.__setstate__({"widget_factory": None, "params": {"rows": 3}})
+        self.assertEqual({"rows": 3}, restored.params)
+        self.assertIsNone(restored._compiled)
+
+        clone = copy.deepcopy(widget_factory)
+        self.assertEqual({"rows": 3}, clone.params)
+        self.assertIsNot(clone.params, widget_factory.params)
+
+        class Subclass(ParameterizedWidget):
+            pass
+
+        widget_factory = Subclass(None, rows=3)
+        widget_factory.foo = 1
+        widget_factory._compile()
+        clone = copy.copy(widget_factory)
+        self.assertEqual(1, clone.foo)
+        self.assertIsNone(clone._compiled)
+
+    def test_traceback_info(self):
+        from plone.autoform.widgets import _TracebackInfo
+        from plone.autoform.widgets import ParameterizedWidget
+        from zope.schema import Field
+
+        info = _TracebackInfo(
+            ParameterizedWidget(None, rows=3),
+            Field(__name__="foo"),
+            "- using default widget factory\n",
+        )
+        self.assertEqual(
+            "ParameterizedWidget, processing:\n"
+            '- field "foo"\n'
+            "- widget: None\n"
+            "- params: {'rows': 3}\n"
+            "- using default widget factory\n",
+            str(info),
+        )
+
+    def test_export_import_handler_cached(self):
+        from plone.autoform.interfaces import IWidgetExportImportHandler
+        from plone.autoform.widgets import DefaultWidgetExportImportHandler
+        from plone.autoform.widgets import ParameterizedWidget
+        from plone.autoform.widgets import WidgetExportImportHandler
+        from plone.autoform.widgets import widgetRegistrationChanged
+        from z3c.form.browser.interfaces import IHTMLTextAreaWidget
+        from zope.component import getGlobalSiteManager
+        from zope.interface.interfaces import Registered
+        from zope.interface.registry import UtilityRegistration
+        from zope.schema import Text
+
+        name = "z3c.form.browser.textarea.TextAreaFieldWidget"
+        widget = ParameterizedWidget(name)
+        field = Text(__name__="body")
+        self.assertIs(
+            DefaultWidgetExportImportHandler, widget.getExportImportHandler(field)
+        )
+
+        handler = WidgetExportImportHandler(IHTMLTextAreaWidget)
+        getGlobalSiteManager().registerUtility(
+            handler, IWidgetExportImportHandler, name=name, event=False
+        )
+        # still cached
+        self.assertIs(
+            DefaultWidgetExportImportHandler, widget.getExportImportHandler(field)
+        )
+
+        widgetRegistrationChanged(
+            Registered(
+                UtilityRegistration(
+                    None, IWidgetExportImportHandler, name, handler, None, ""
+                )
+            )
+        )
+        self.assertIs(handler, widget.getExportImportHandler(field))
+        self.assertIs(
+            handler, ParameterizedWidget(name, rows=3).getExportImportHandler(field)
+        )
+
+    def test_export_import_handler_read(self):
+        from lxml import etree
+        from plone.autoform.widgets import WidgetExportImportHandler
+        from z3c.form.browser.interfaces import IHTMLTextAreaWidget
+
+        node = etree.fromstring(
+            "<widget>"
+            "<rows>3</rows>"
+            "<!-- a comment -->"
+            "<unknown>1</unknown>"
+            '<klass xmlns="http://example.com">large</klass>'
+            "<rows>5</rows>"
+            "</widget>"
+        )
+        params = {}
+        WidgetExportImportHandler(IHTMLTextAreaWidget).read(node, params)
+        self.assertEqual({"rows": 5, "klass": "large"}, params)
@@ -1,4 +1,7 @@
 from AccessControl import getSecurityManager
+from collections import namedtuple
+from plone.autoform.instrumentation import beginProfile
+from plone.autoform.instrumentation import currentProfile
 from plone.autoform.interfaces import IParameterizedWidget
 from plone.autoform.interfaces import MODES_KEY
 from plone.autoform.interfaces import OMITTED_KEY
@@ -8,29 +11,193 @@ from plone.autoform.interfaces import WIDGETS_KEY
 from plone.autoform.interfaces import WRITE_PERMISSIONS_KEY
 from plone.supermodel.interfaces import DEFAULT_ORDER
 from plone.supermodel.interfaces import FIELDSETS_KEY
+from plone.supermodel.model import Fieldset
 from plone.supermodel.utils import mergedTaggedValueDict
 from plone.supermodel.utils import mergedTaggedValueList
 from plone.z3cform.fieldsets.group import GroupFactory
 from plone.z3cform.fieldsets.utils import move
 from z3c.form import field
+from z3c.form.field import WidgetFactories
 from z3c.form.interfaces import DISPLAY_MODE
 from z3c.form.interfaces import IFieldWidget
 from z3c.form.interfaces import INPUT_MODE
 from z3c.form.util import expandPrefix
-from zope.component import queryUtility
+from zope.component import getSiteManager
 from zope.deprecation import deprecate
 from zope.dottedname.resolve import resolve
 from zope.interface import providedBy
+from zope.interface.interfaces import IUtilityRegistration
+from zope.schema import getFieldsInOrder
 from zope.security.interfaces import IPermission
 
-_dottedCache = {}
+import copy
+import hashlib
+import sys
+import threading
+import time
+import weakref
+
+
+class DottedNameCache:
+    """Cache for resolved dotted names.
+
+    Resolution happens outside of the lock, so that imports triggered by it
+    cannot dead-lock with other threads; at worst a name is resolved twice.
+    Names which cannot be resolved are remembered for failureTTL seconds and
+    raise the same error again without trying to import anything. If maxsize
+    is given, the oldest entries are dropped when it is exceeded.
+    """
+
+    def __init__(self, maxsize=None, failureTTL=60.0):
+        self.maxsize = maxsize
+        self.failureTTL = failureTTL
+        self._lock = threading.Lock()
+        self._resolved = {}  # name => object
+        self._failures = {}  # name => (expires, exception)
+        self.hits = 0
+        self.misses = 0
+        self.failureHits = 0
+
+    def resolve(self, dottedName):
+        try:
+            value = self._resolved[dottedName]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+
+        failure = self._failures.get(dottedName)
+        if failure is not None:
+            if failure[0] > time.monotonic():
+                self.failureHits += 1
+                raise copy.copy(failure[1])
+            with self._lock:
+                if self._failures.get(dottedName) is failure:
+                    del self._failures[dottedName]
+
+        self.misses += 1
+        try:
+            value = resolve(dottedName)
+        except Exception as e:
+            if self.failureTTL:
+                with self._lock:
+                    self._store(
+                        self._failures,
+                        dottedName,
+                        (time.monotonic() + self.failureTTL, e),
+                    )
+            raise
+        with self._lock:
+            return self._store(self._resolved, dottedName, value)
+
+    def _store(self, mapping, key, value):
+        value = mapping.setdefault(key, value)
+        if self.maxsize is not None:
+            while len(mapping) > self.maxsize:
+                del mapping[next(iter(mapping))]
+        return value
+
+    def prime(self, dottedName, value):
+        """Remember value as the object dottedName resolves to, e.g. for a
+        class which is at hand already
+        """
+        with self._lock:
+            return self._store(self._resolved, dottedName, value)
+
+    def stats(self):
+        """Return a dict with the number of hits, misses, cached failures
+        returned, and cached names and failures
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "failureHits": self.failureHits,
+            "size": len(self._resolved),
+            "failures": len(self._failures),
+        }
+
+    def clear(self):
+        """Forget all resolved names and failures, e.g. after code reloads"""
+        with self._lock:
+            self._resolved.clear()
+            self._failures.clear()
+            self.hits = self.misses = self.failureHits = 0
+
+    def __contains__(self, dottedName):
+        return dottedName in self._resolved
+
+    def __len__(self):
+        return len(self._resolved)
+
+
+_dottedCache = DottedNameCache()
+
+
+class FieldHint(namedtuple("FieldHint", ["interface", "field", "value"])):
+    """An entry of the omitted and modes tagged values: the form interface it
+    applies to, the field name and the value. It is a plain tuple otherwise,
+    so existing readers and comparisons keep working.
+    """
+
+    __slots__ = ()
+    __repr__ = tuple.__repr__
+
+    def __reduce__(self):
+        return (tuple, (tuple(self),))
+
+
+class OrderHint(namedtuple("OrderHint", ["field", "direction", "target"])):
+    """An entry of the order tagged value: the field name, 'before' or
+    'after', and the name of the field it is moved relative to.
+    """
+
+    __slots__ = ()
+    __repr__ = tuple.__repr__
+
+    def __reduce__(self):
+        return (tuple, (tuple(self),))
+
+
+def _intern(value):
+    # only plain strings can be interned, not e.g. message ids
+    return sys.intern(value) if type(value) is str else value
+
+
+def fieldHint(interface, fieldName, value):
+    """Return a FieldHint, sharing the strings in it with all other hints"""
+    return FieldHint(interface, _intern(fieldName), _intern(value))
+
+
+def orderHint(fieldName, direction, target):
+    """Return an OrderHint, sharing the strings in it with all other hints"""
+    return OrderHint(_intern(fieldName), _intern(direction), _intern(target))
+
+
+# Tagged values that influence the layout of an autoform
+LAYOUT_KEYS = (
+    OMITTED_KEY,
+    MODES_KEY,
+    WIDGETS_KEY,
+    ORDER_KEY,
+    READ_PERMISSIONS_KEY,
+    WRITE_PERMISSIONS_KEY,
+    FIELDSETS_KEY,
+)
 
 
 def resolveDottedName(dottedName):
     """Resolve a dotted name to a real object"""
-    if dottedName not in _dottedCache:
-        _dottedCache[dottedName] = resolve(dottedName)
-    return _dottedCache[dottedName]
+    return _dottedCache.resolve(dottedName)
+
+
+# (schema, tagged value name, form specification) => (snapshot, values)
+_mergedForFormCache = {}
+MERGED_CACHE_SIZE = 10000
+
+# (schema, prefix, omitReadOnly) => (snapshot, Fields with template fields)
+_fieldTemplateCache = {}
+FIELD_TEMPLATE_CACHE_SIZE = 10000
 
 
 def mergedTaggedValuesForIRO(schema, name, iro):
@@ -40,17 +207,19 @@ def mergedTaggedValuesForIRO(schema, name, iro):
     whose interface is highest in the interface resolution order, among the
     interfaces actually provided by 'form'.
     """
+    # position of each interface in the resolution order, the first
+    # occurrence counts
+    positions = {}
+    for index, interface in enumerate(iro):
+        positions.setdefault(interface, index)
+
     # filter out settings irrelevant to this form
-    threeples = [t for t in mergedTaggedValueList(schema, name) if t[0] in iro]
+    threeples = [t for t in mergedTaggedValueList(schema, name) if t[0] in positions]
 
     # Sort by interface resolution order of the form interface,
     # then by IRO of the interface the value came from
     # (that is the input order, so we can rely on Python's stable sort)
-    def by_iro(threeple):
-        interface = threeple[0]
-        return iro.index(interface)
-
-    threeples.sort(key=by_iro)
+    threeples.sort(key=lambda threeple: positions[threeple[0]])
     d = {}
     # Now iterate through in the reverse order -- the values assigned last win.
     for _, fieldName, value in reversed(threeples):
@@ -59,13 +228,281 @@ def mergedTaggedValuesForIRO(schema, name, iro):
 
 
 def mergedTaggedValuesForForm(schema, name, form):
-    form_iro = list(providedBy(form).flattened())
-    return mergedTaggedValuesForIRO(schema, name, form_iro)
+    """Like mergedTaggedValuesForIRO(), using the interfaces provided by
+    'form'. Results are cached until the tagged value changes on the schema
+    or one of its bases.
+    """
+    spec = providedBy(form)
+    snapshot = _taggedValueSnapshot(schema, name)
+    try:
+        key = (schema, name, spec)
+        cached = _mergedForFormCache.get(key)
+    except TypeError:
+        return mergedTaggedValuesForIRO(schema, name, list(spec.flattened()))
+    if cached is None or cached[0] != snapshot:
+        values = mergedTaggedValuesForIRO(schema, name, list(spec.flattened()))
+        if len(_mergedForFormCache) >= MERGED_CACHE_SIZE:
+            _mergedForFormCache.clear()
+        _mergedForFormCache[key] = cached = (snapshot, values)
+    return dict(cached[1])
 
 
 # Some helper functions
 
 
+def _snapshotTaggedValue(name, value):
+    """Return a comparable copy of the contents of a tagged value, so that
+    in-place modifications can be detected later on.
+    """
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return tuple(value.items())
+    if name == FIELDSETS_KEY:
+        return tuple(
+            (fs, fs.label, fs.description, fs.order, tuple(fs.fields)) for fs in value
+        )
+    return tuple(value)
+
+
+def _taggedValueSnapshot(schema, name):
+    """Snapshot the tagged value 'name' on a schema and all of its bases"""
+    return tuple(
+        _snapshotTaggedValue(name, iface.queryDirectTaggedValue(name))
+        for iface in schema.__iro__
+    )
+
+
+def _schemaSnapshot(schema, names=LAYOUT_KEYS):
+    """Snapshot the fields and the given tagged values of a schema and all
+    of its bases. Two snapshots compare equal as long as nothing relevant for
+    building a form from the schema has changed in between.
+    """
+    snapshot = []
+    for iface in schema.__iro__:
+        snapshot.append(_fieldsSnapshot(iface))
+        for name in names:
+            snapshot.append(
+                _snapshotTaggedValue(name, iface.queryDirectTaggedValue(name))
+            )
+    return tuple(snapshot)
+
+
+def _fieldsSnapshot(iface):
+    """Snapshot the attributes of an interface, including the field
+    properties which are commonly changed in place (order and readonly).
+    """
+    return tuple(
+        (
+            name,
+            description,
+            getattr(description, "order", None),
+            getattr(description, "readonly", None),
+        )
+        for name, description in iface.namesAndDescriptions()
+    )
+
+
+# id(schema) => (weak reference to schema, generation, tagged values last seen)
+_generations = {}
+_generationsLock = threading.Lock()
+
+
+def _generation(schema):
+    entry = _generations.get(id(schema))
+    if entry is None or entry[0]() is not schema:
+        return 0, None
+    return entry[1], entry[2]
+
+
+def _setGeneration(schema, generation, seen):
+    key = id(schema)
+    entry = _generations.get(key)
+    if entry is not None and entry[0]() is schema:
+        ref = entry[0]
+    else:
+
+        def forget(ref, key=key):
+            entry = _generations.get(key)
+            if entry is not None and entry[0] is ref:
+                del _generations[key]
+
+        ref = weakref.ref(schema, forget)
+    _generations[key] = (ref, generation, seen)
+
+
+def bumpGeneration(schema):
+    """Record that the form hints of schema have been changed. Called by
+    everything in plone.autoform which changes them on an existing schema.
+    """
+    with _generationsLock:
+        generation, seen = _generation(schema)
+        _setGeneration(schema, generation + 1, seen)
+
+
+def schemaGeneration(schema):
+    """Return a stamp of the form hints and fieldsets set directly on schema.
+    It changes when bumpGeneration() is called for the schema, and when one
+    of these tagged values is replaced or grows or shrinks, e.g. by calling
+    setTaggedValue() directly. Items replaced in place by other code are only
+    noticed by snapshots or layoutFingerprint(). Nothing is recorded for
+    schemata without any of these tagged values, e.g. Interface.
+    """
+    values = tuple(schema.queryDirectTaggedValue(key) for key in LAYOUT_KEYS)
+    generation, seen = _generation(schema)
+    if seen is None and not any(value is not None for value in values):
+        return (generation,) + values
+    if seen is None or any(value is not old for value, old in zip(values, seen)):
+        with _generationsLock:
+            generation, seen = _generation(schema)
+            if seen is not None and any(
+                value is not old for value, old in zip(values, seen)
+            ):
+                generation += 1
+            # keeping the values makes sure that a replaced value is noticed
+            _setGeneration(schema, generation, values)
+    return (generation,) + tuple(
+        None if value is None else len(value) for value in values
+    )
+
+
+def combinedGeneration(schema):
+    """Return a stamp over schemaGeneration() of schema and all of its bases"""
+    return tuple(schemaGeneration(iface) for iface in schema.__iro__)
+
+
+# schema => (snapshot, fingerprint)
+_fingerprintCache = {}
+
+
+def _fingerprintValue(value):
+    """Return a representation of a tagged value which is the same in every
+    process, e.g. dotted names instead of objects.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return repr(str(value) if isinstance(value, str) else value)
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(
+            sorted(
+                f"{_fingerprintValue(k)}: {_fingerprintValue(v)}"
+                for k, v in value.items()
+            )
+        )
+    if isinstance(value, (list, tuple)):
+        return "(%s)" % ", ".join(_fingerprintValue(v) for v in value)
+    if IParameterizedWidget.providedBy(value):
+        return "ParameterizedWidget({}, {})".format(
+            _fingerprintValue(value.getWidgetFactoryName()),
+            _fingerprintValue(value.params),
+        )
+    identifier = getattr(value, "__identifier__", None)
+    if isinstance(identifier, str):
+        return identifier
+    if isinstance(value, Fieldset):
+        return "Fieldset({})".format(
+            _fingerprintValue(
+                (
+                    value.__name__,
+                    value.label,
+                    value.description,
+                    value.order,
+                    tuple(value.fields),
+                )
+            )
+        )
+    if not hasattr(value, "__qualname__"):
+        value = type(value)
+    return f"{value.__module__}.{value.__qualname__}"
+
+
+def _widgetParamsSnapshot(schema):
+    snapshot = []
+    for iface in schema.__iro__:
+        widgets = iface.queryDirectTaggedValue(WIDGETS_KEY)
+        for widget in (widgets or {}).values():
+            if IParameterizedWidget.providedBy(widget):
+                snapshot.append((widget.widget_factory, tuple(widget.params.items())))
+    return tuple(snapshot)
+
+
+def _schemaFingerprint(schema):
+    # unlike the layout, the fingerprint also depends on the widget params
+    snapshot = (_schemaSnapshot(schema), _widgetParamsSnapshot(schema))
+    cached = _fingerprintCache.get(schema)
+    if cached is not None and cached[0] == snapshot:
+        return cached[1]
+    digest = hashlib.sha1(schema.__identifier__.encode("utf-8"))
+    for name, description in getFieldsInOrder(schema):
+        digest.update(_fingerprintValue((name, type(description))).encode("utf-8"))
+    for iface in schema.__iro__:
+        for key in LAYOUT_KEYS:
+            value = iface.queryDirectTaggedValue(key)
+            if value:
+                digest.update(
+                    _fingerprintValue((iface.__identifier__, key, value)).encode(
+                        "utf-8"
+                    )
+                )
+    fingerprint = digest.hexdigest()
+    if len(_fingerprintCache) >= FIELD_TEMPLATE_CACHE_SIZE:
+        _fingerprintCache.clear()
+    _fingerprintCache[schema] = (snapshot, fingerprint)
+    return fingerprint
+
+
+def layoutFingerprint(schemata, prefixes=None):
+    """Return a hex digest which changes whenever the layout of a form built
+    from the given schemata may change: their fields and field types, and
+    the form hints and fieldsets set on them or their bases. It is the same
+    in every process, so it can be used for ETags and cache keys.
+
+    prefixes optionally maps schemata to the prefix of their fields.
+    """
+    prefixes = prefixes or {}
+    digest = hashlib.sha1()
+    for schema in schemata:
+        digest.update(
+            "{} {} {}\n".format(
+                schema.__identifier__,
+                prefixes.get(schema, ""),
+                _schemaFingerprint(schema),
+            ).encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+def _fieldTemplates(schema, prefix, omitReadOnly):
+    """Return field.Fields(schema, prefix=prefix, omitReadOnly=omitReadOnly),
+    built once as long as the fields of the schema do not change. The fields
+    in it are shared and must be copied with _cloneField() before changing
+    them or adding them to a form.
+    """
+    key = (schema, prefix, omitReadOnly)
+    snapshot = tuple(_fieldsSnapshot(iface) for iface in schema.__iro__)
+    cached = _fieldTemplateCache.get(key)
+    if cached is not None and cached[0] == snapshot:
+        return cached[1]
+    templates = field.Fields(schema, prefix=prefix, omitReadOnly=omitReadOnly)
+    if len(_fieldTemplateCache) >= FIELD_TEMPLATE_CACHE_SIZE:
+        _fieldTemplateCache.clear()
+    _fieldTemplateCache[key] = (snapshot, templates)
+    return templates
+
+
+def _cloneField(fieldInstance):
+    """Return a copy of a z3c.form Field which can be modified without
+    touching the original.
+    """
+    clone = fieldInstance.__class__.__new__(fieldInstance.__class__)
+    clone.__dict__.update(fieldInstance.__dict__)
+    factories = fieldInstance.__dict__.get("_widgetFactories")
+    if factories is not None:
+        clone._widgetFactories = WidgetFactories()
+        clone._widgetFactories.update(factories)
+        clone._widgetFactories.default = factories.default
+    return clone
+
+
 def _process_prefixed_name(prefix, fieldName):
     """Give prefixed fieldname if applicable"""
     if prefix:
@@ -86,6 +523,8 @@ def _bn(fieldInstance):
 
 def _process_widgets(form, widgets, modes, newFields):
     """Update the fields list with widgets"""
+    profile = currentProfile(form)
+    profile.mark("fieldsets")
 
     for fieldName in newFields:
         fieldInstance = newFields[fieldName]
@@ -109,6 +548,8 @@ def _process_widgets(form, widgets, modes, newFields):
         if baseName in modes:
             newFields[fieldName].mode = widgetMode
 
+    profile.mark("widgets")
+
 
 def _process_fieldsets(form, schema, groups, all_fields, prefix, default_group):
     """Keep track of which fields are in a fieldset, and, by elimination,
@@ -123,14 +564,28 @@ def _process_fieldsets(form, schema, groups, all_fields, prefix, default_group):
     # list of IFieldset instances
     fieldsets = mergedTaggedValueList(schema, FIELDSETS_KEY)
 
-    # process primary schema fieldsets
+    # Sort the fields into fieldsets in one pass. A field may be listed in
+    # more than one fieldset, those not listed in any go to the default.
     fieldset_fields = []
+    in_fieldsets = set()
     for fieldset in fieldsets:
+        selected = []
         for field_name in fieldset.fields:
-            fieldset_fields.append(_process_prefixed_name(prefix, field_name))
+            field_name = _process_prefixed_name(prefix, field_name)
+            in_fieldsets.add(field_name)
+            field_instance = all_fields.get(field_name)
+            if field_instance is not None:
+                selected.append(field_instance)
+        fieldset_fields.append(selected)
 
     # Set up the default fields, widget factories and widget modes
-    new_fields = all_fields.omit(*fieldset_fields)
+    new_fields = field.Fields(
+        *[
+            field_instance
+            for field_name, field_instance in all_fields.items()
+            if field_name not in in_fieldsets
+        ]
+    )
     _process_widgets(form, widgets, modes, new_fields)
 
     if not default_group:
@@ -140,14 +595,8 @@ def _process_fieldsets(form, schema, groups, all_fields, prefix, default_group):
 
     # Set up fields for fieldsets
 
-    for fieldset in fieldsets:
-        new_fields = all_fields.select(
-            *[
-                _process_prefixed_name(prefix, name)
-                for name in fieldset.fields
-                if _process_prefixed_name(prefix, name) in all_fields
-            ]
-        )
+    for fieldset, selected in zip(fieldsets, fieldset_fields):
+        new_fields = field.Fields(*selected)
 
         if fieldset.__name__ in groups:
             # Process also, if no fields are defined to allow fieldset-only
@@ -183,16 +632,204 @@ def _process_fieldsets(form, schema, groups, all_fields, prefix, default_group):
                 groups[group.__name__] = group
 
 
+# site manager => {permission name: title or None}
+_permissionTitles = weakref.WeakKeyDictionary()
+
+
+def permissionTitle(permissionName):
+    """Return the title of the IPermission utility with the given name, which
+    is what security managers check, or None if there is none. The titles
+    found are kept until a permission is registered or unregistered with
+    events, as ZCML does (provideUtility() does not send events). Permissions
+    which are not found are looked up again every time, as they are granted.
+    """
+    sm = getSiteManager()
+    try:
+        titles = _permissionTitles[sm]
+    except KeyError:
+        titles = _permissionTitles.setdefault(sm, {})
+    try:
+        return titles[permissionName]
+    except KeyError:
+        pass
+    permission = sm.queryUtility(IPermission, name=permissionName)
+    if permission is None:
+        return None
+    title = titles[permissionName] = permission.title
+    return title
+
+
+def permissionRegistrationChanged(event):
+    """Drop the permission titles when a permission is (un)registered"""
+    registration = event.object
+    if IUtilityRegistration.providedBy(registration) and (
+        registration.provided.isOrExtends(IPermission)
+    ):
+        _permissionTitles.clear()
+        if _decisionCache is not None:
+            _decisionCache.clear()
+
+
+try:
+    from zope.testing.cleanup import addCleanUp
+except ImportError:  # pragma: no cover
+    pass
+else:
+    # test set ups replace registrations without events
+    addCleanUp(_permissionTitles.clear)
+
+
+class PermissionDecisionCache:
+    """Opt-in cache of permission checks across requests.
+
+    The outcome of checking a permission on a context only depends on the
+    roles of the user there and the roles granted the permission there.
+    signature(context, securityManager) must return a hashable value which
+    covers both, e.g. the user's roles in the context and the security
+    settings of the context. Decisions are cached per permission and
+    signature. If the signature is None, the permission is checked without
+    caching.
+
+    The cache is cleared when permissions are registered or unregistered. Call
+    clear() when anything else the signatures cannot reflect changes. If
+    maxsize is given, the oldest decisions are dropped when it is exceeded.
+    """
+
+    def __init__(self, signature, maxsize=10000):
+        self.signature = signature
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._decisions = {}  # (permission title, signature) => allowed
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def check(self, title, context, securityManager):
+        signature = self.signature(context, securityManager)
+        if signature is None:
+            self.uncached += 1
+            return bool(securityManager.checkPermission(title, context))
+        key = (title, signature)
+        try:
+            allowed = self._decisions[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return allowed
+
+        self.misses += 1
+        allowed = bool(securityManager.checkPermission(title, context))
+        with self._lock:
+            self._decisions[key] = allowed
+            if self.maxsize is not None:
+                while len(self._decisions) > self.maxsize:
+                    del self._decisions[next(iter(self._decisions))]
+        return allowed
+
+    def prime(self, dottedName, value):
+        """Remember value as the object dottedName resolves to, e.g. for a
+        class which is at hand already
+        """
+        with self._lock:
+            return self._store(self._resolved, dottedName, value)
+
+    def stats(self):
+        """Return a dict with the number of hits, misses, checks which could
+        not be cached, and cached decisions
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "size": len(self._decisions),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._decisions.clear()
+            self.hits = self.misses = self.uncached = 0
+
+    def __len__(self):
+        return len(self._decisions)
+
+
+_decisionCache = None
+
+
+def setPermissionDecisionCache(cache):
+    """Use the given PermissionDecisionCache for all forms, or stop caching
+    permission checks across requests if cache is None. Returns the cache
+    used before.
+    """
+    global _decisionCache
+    previous, _decisionCache = _decisionCache, cache
+    return previous
+
+
+class PermissionDecisions:
+    """Memo of permission checks made while setting up the forms of one
+    request. It is shared by the main schema, additional schemata, groups
+    and sub-forms, so that every permission is only looked up and checked
+    once per context and security manager.
+    """
+
+    def __init__(self):
+        self.decisions = {}  # (name, context, manager) => (allowed, pinned)
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, permission_name, context):
+        """Check a permission (given as IPermission utility name) on the
+        context. Permissions which cannot be found are always granted.
+        """
+        security_manager = getSecurityManager()
+        key = (permission_name, id(context), id(security_manager))
+        decision = self.decisions.get(key)
+        if decision is not None:
+            self.hits += 1
+            return decision[0]
+
+        self.misses += 1
+        title = permissionTitle(permission_name)
+        if title is None:
+            allowed = True
+        elif _decisionCache is not None:
+            allowed = _decisionCache.check(title, context, security_manager)
+        else:
+            allowed = bool(security_manager.checkPermission(title, context))
+        # keep context and security manager alive, so their ids stay unique
+        self.decisions[key] = (allowed, (context, security_manager))
+        return allowed
+
+
+_PERMISSION_DECISIONS_ATTR = "_plone_autoform_permission_decisions"
+
+
+def getPermissionDecisions(request):
+    """Return the permission decisions memo for the given request. If the
+    request cannot hold one, a new memo is returned every time.
+    """
+    decisions = getattr(request, _PERMISSION_DECISIONS_ATTR, None)
+    if decisions is None:
+        decisions = PermissionDecisions()
+        try:
+            setattr(request, _PERMISSION_DECISIONS_ATTR, decisions)
+        except (AttributeError, TypeError):
+            pass
+    return decisions
+
+
 def _process_permissions(schema, form, all_fields):
     # Get either read or write permissions depending on what type of
     # form this is
-    permission_cache = {}  # permission name -> allowed/disallowed
+    decisions = getPermissionDecisions(getattr(form, "request", None))
+    hits, misses = decisions.hits, decisions.misses
 
     # name => permission name
     read_permissions = mergedTaggedValueDict(schema, READ_PERMISSIONS_KEY)
     # name => permission name
     write_permissions = mergedTaggedValueDict(schema, WRITE_PERMISSIONS_KEY)
-    security_manager = getSecurityManager()
     disallowed_fields = []
 
     for field_name, field_instance in all_fields.items():
@@ -205,17 +842,12 @@ def _process_permissions(schema, form, all_fields):
             permission_name = write_permissions.get(base_name, None)
         if permission_name is None:
             continue
-        if permission_name not in permission_cache:
-            permission = queryUtility(IPermission, name=permission_name)
-            if permission is None:
-                permission_cache[permission_name] = True
-            else:
-                permission_cache[permission_name] = bool(
-                    security_manager.checkPermission(permission.title, form.context)
-                )
-        if not permission_cache.get(permission_name, True):
+        if not decisions.check(permission_name, form.context):
             disallowed_fields.append(field_name)
 
+    profile = currentProfile(form)
+    profile.count("permission_checks", decisions.misses - misses)
+    profile.count("permission_cache_hits", decisions.hits - hits)
     return all_fields.omit(*disallowed_fields)
 
 
@@ -229,35 +861,56 @@ def processFields(form, schema, prefix="", defaultGroup=None, permissionChecks=T
     permission checks are ignored.
     """
 
-    # Get data from tagged values, flattening data from super-interfaces
-
-    # Note: The names always refer to a field in the schema, and never
-    # contain a prefix.
+    profile = beginProfile(form)
+    try:
+        # Get data from tagged values, flattening data from super-interfaces
 
-    # { name => True }
-    omitted = mergedTaggedValuesForForm(schema, OMITTED_KEY, form)
+        # Note: The names always refer to a field in the schema, and never
+        # contain a prefix.
 
-    # Find the fields we should not worry about
-    groups = {}
-    do_not_process = list(form.fields.keys())
+        # { name => True }
+        omitted = mergedTaggedValuesForForm(schema, OMITTED_KEY, form)
 
-    for field_name, status in omitted.items():
-        if status and status != "false":
-            do_not_process.append(_process_prefixed_name(prefix, field_name))
+        # Find the fields we should not worry about
+        groups = {}
+        do_not_process = list(form.fields.keys())
 
-    for group in form.groups:
-        do_not_process.extend(list(group.fields.keys()))
-        groups[getattr(group, "__name__", group.label)] = group
+        for field_name, status in omitted.items():
+            if status and status != "false":
+                do_not_process.append(_process_prefixed_name(prefix, field_name))
 
-    # Find all allowed fields so that we have something to select from
-    omit_read_only = form.mode != DISPLAY_MODE
-    all_fields = field.Fields(schema, prefix=prefix, omitReadOnly=omit_read_only).omit(
-        *do_not_process
-    )
+        for group in form.groups:
+            do_not_process.extend(list(group.fields.keys()))
+            groups[getattr(group, "__name__", group.label)] = group
+        profile.mark("merge")
 
-    if permissionChecks:
-        all_fields = _process_permissions(schema, form, all_fields)
-    _process_fieldsets(form, schema, groups, all_fields, prefix, defaultGroup)
+        # Find all allowed fields so that we have something to select from
+        omit_read_only = form.mode != DISPLAY_MODE
+        templates = _fieldTemplates(schema, prefix, omit_read_only)
+        do_not_process = set(do_not_process)
+        all_fields = field.Fields(
+            *[
+                template
+                for name, template in templates.items()
+                if name not in do_not_process
+            ]
+        )
+        profile.count("schemata")
+        profile.count("fields", len(all_fields))
+        profile.mark("fields")
+
+        if permissionChecks:
+            all_fields = _process_permissions(schema, form, all_fields)
+            profile.mark("permissions")
+
+        # Copy the fields which make it into the form, they are changed below
+        # and possibly by the form itself
+        all_fields = field.Fields(*[_cloneField(f) for f in all_fields.values()])
+        profile.mark("fields")
+        _process_fieldsets(form, schema, groups, all_fields, prefix, defaultGroup)
+        profile.mark("fieldsets")
+    finally:
+        profile.end()
 
 
 @deprecate(
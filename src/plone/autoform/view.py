@@ -1,9 +1,255 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from collections.abc import Sequence
 from plone.autoform.base import AutoFields
 from plone.autoform.interfaces import IWidgetsView
 from plone.z3cform import z2
+from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
 from z3c.form.form import DisplayForm
+from z3c.form.interfaces import HIDDEN_MODE
+from z3c.form.interfaces import IDataConverter
+from z3c.form.interfaces import IDataManager
+from z3c.form.interfaces import IFieldWidget
 from z3c.form.interfaces import IFormLayer
+from zope.component import ComponentLookupError
+from zope.component import getMultiAdapter
+from zope.component import getSiteManager
+from zope.component import queryMultiAdapter
+from zope.i18n import translate
 from zope.interface import implementer
+from zope.interface import providedBy
+from zope.location import locate
+from zope.schema.interfaces import IChoice
+from zope.schema.interfaces import ICollection
+from zope.schema.interfaces import IVocabularyTokenized
+
+DisplayValue = namedtuple("DisplayValue", ["fieldset", "field", "label", "value"])
+DisplayValue.__doc__ = """A field shown by WidgetsView.displayValues().
+
+fieldset is None for the default fieldset or the name of the group, field the
+(prefixed) field name, label the translated title of the field and value its
+value as converted for the display widget, with the translated titles of
+vocabulary terms instead of the values for choices.
+"""
+
+
+def _translate(text, request):
+    if isinstance(text, str):
+        return translate(text, context=request)
+    return text
+
+
+def _termTitle(vocabulary, value, request):
+    if not IVocabularyTokenized.providedBy(vocabulary):
+        return value
+    try:
+        term = vocabulary.getTerm(value)
+    except LookupError:
+        return value
+    if term.title is None:
+        return term.token
+    return _translate(term.title, request)
+
+
+def _displayValue(formField, mode, content, value, request):
+    """Turn a field value into something which can be shown to users, like
+    the display widget of the field would. The widget is created to look up
+    its data converter, but not updated.
+    """
+    field = formField.field
+    if value is None or value is field.missing_value:
+        return None
+    if IChoice.providedBy(field):
+        return _termTitle(field.bind(content).vocabulary, value, request)
+    if ICollection.providedBy(field) and IChoice.providedBy(field.value_type):
+        vocabulary = field.value_type.bind(content).vocabulary
+        return [_termTitle(vocabulary, item, request) for item in value]
+    factory = formField.widgetFactory.get(mode)
+    try:
+        if factory is not None:
+            widget = factory(field, request)
+        else:
+            widget = getMultiAdapter((field, request), IFieldWidget)
+        widget.mode = mode
+        widget.context = content
+        converter = getMultiAdapter((field, widget), IDataConverter)
+    except ComponentLookupError:
+        return value
+    return converter.toWidgetValue(value)
+
+
+class _LazyWidgets(Mapping):
+    """The ``w`` shortcut of a WidgetsView in lazy mode. Widgets of the main
+    fieldset are set up one at a time, those of other fieldsets one group at
+    a time, when they are looked up. Iterating sets up everything.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.factories = tuple(view.groups)
+        self.groups = [None] * len(self.factories)
+        self.built = {}
+        # widget manager holding the widgets of the main fieldset set up so
+        # far, which becomes the ``widgets`` of the view
+        self.manager = None
+        self.complete = False
+        # name => None for the main fieldset, or index of the group. As with
+        # eager set up, a widget in a group wins over one of the same name in
+        # the main fieldset.
+        self.containers = dict.fromkeys(view.fields.keys())
+        for index, factory in enumerate(self.factories):
+            for name in factory.fields.keys():
+                self.containers[name] = index
+
+    def __getitem__(self, name):
+        widget = self.built.get(name)
+        if widget is None:
+            index = self.containers[name]
+            if index is None:
+                widget = self._widget(name)
+            else:
+                widget = self.group(index).widgets[name]
+            self.built[name] = widget
+        return widget
+
+    def __iter__(self):
+        self.materialize()
+        return iter(self.built)
+
+    def __len__(self):
+        self.materialize()
+        return len(self.built)
+
+    def _widget(self, name):
+        """Set up the widget of a single field of the main fieldset"""
+        widgets = self.view.__dict__.get("_widgets")
+        if widgets is not None:
+            return widgets[name]
+        return self._addWidgets((name,))[name]
+
+    def _addWidgets(self, names):
+        """Set up the widgets of the given fields of the main fieldset and add
+        them to the manager
+        """
+        view = self.view
+        fields = view.fields
+        view.fields = fields.select(*names)
+        try:
+            view.updateWidgets()
+            widgets = view.__dict__["_widgets"]
+        finally:
+            view.fields = fields
+            view.__dict__.pop("_widgets", None)
+
+        manager = self.manager
+        if manager is None:
+            self.manager = widgets
+            return widgets
+        added = dict(manager.items())
+        for name, widget in widgets.items():
+            added[name] = widget
+            locate(widget, manager, name)
+        manager.hasRequiredFields = (
+            manager.hasRequiredFields or widgets.hasRequiredFields
+        )
+        manager.create_according_to_list(added, fields.keys())
+        return widgets
+
+    def group(self, index):
+        group = self.groups[index]
+        if group is None:
+            view = self.view
+            group = self.factories[index](view.context, view.request, view)
+            widgets = view.__dict__.get("_widgets")
+            if widgets is None:
+                # groups only copy these settings from the widgets of the
+                # main fieldset, do not set all of them up for that
+                view.__dict__["_widgets"] = _WidgetSettings(view)
+            try:
+                group.update()
+            finally:
+                if widgets is None:
+                    view.__dict__.pop("_widgets", None)
+            self.groups[index] = group
+        return group
+
+    def materializeWidgets(self):
+        """Set up the remaining widgets of the main fieldset, keeping those
+        set up before
+        """
+        view = self.view
+        widgets = view.__dict__.get("_widgets")
+        if widgets is None:
+            manager = self.manager
+            missing = [
+                name
+                for name in view.fields.keys()
+                if manager is None or name not in manager
+            ]
+            if manager is None or missing:
+                self._addWidgets(missing)
+            widgets = view.__dict__["_widgets"] = self.manager
+        return widgets
+
+    def materialize(self):
+        """Set up all widgets and groups, like WidgetsView does eagerly"""
+        if self.complete:
+            return
+        for name, widget in self.materializeWidgets().items():
+            self.built.setdefault(name, widget)
+        for index in range(len(self.factories)):
+            self.built.update(self.group(index).widgets.items())
+        self.view.groups = tuple(self.groups)
+        self.complete = True
+
+
+class _WidgetSettings:
+    def __init__(self, view):
+        self.mode = view.mode
+        self.ignoreContext = view.ignoreContext
+        self.ignoreRequest = view.ignoreRequest
+        self.ignoreReadonly = view.ignoreReadonly
+
+
+class _LazyFieldsets(Mapping):
+    """The ``fieldsets`` of a WidgetsView in lazy mode"""
+
+    def __init__(self, widgets):
+        self.widgets = widgets
+        self.names = {}
+        for index, factory in enumerate(widgets.factories):
+            self.names[getattr(factory, "__name__", str(index))] = index
+
+    def __getitem__(self, name):
+        return self.widgets.group(self.names[name])
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class _LazyGroups(Sequence):
+    """The ``groups`` of a WidgetsView in lazy mode"""
+
+    def __init__(self, widgets):
+        self.widgets = widgets
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.widgets.group(index)
+
+    def __len__(self):
+        return len(self.widgets.factories)
+
+    def __repr__(self):
+        return repr(tuple(self))
 
 
 @implementer(IWidgetsView)
@@ -23,6 +269,25 @@ class WidgetsView(AutoFields, DisplayForm):
     w = None
     fieldsets = None
 
+    # Set up widgets and groups only when they are looked up in ``w``,
+    # ``fieldsets`` or ``groups``, or when ``widgets`` is accessed. Views
+    # which override updateWidgets() are always set up eagerly, as their
+    # customizations expect all widgets of the default fieldset.
+    lazyWidgets = False
+
+    @property
+    def widgets(self):
+        widgets = self.__dict__.get("_widgets")
+        if widgets is None:
+            lazy = self.__dict__.get("w")
+            if isinstance(lazy, _LazyWidgets):
+                widgets = lazy.materializeWidgets()
+        return widgets
+
+    @widgets.setter
+    def widgets(self, value):
+        self.__dict__["_widgets"] = value
+
     def update(self):
         # The ++widget++ traverser only calls update, not __call__
         self._update()
@@ -32,20 +297,180 @@ class WidgetsView(AutoFields, DisplayForm):
             return self.index()
         raise NotImplementedError("You must implement the 'render' method")
 
+    # Render the page, and the default fieldset and then one group after the
+    # other where the template calls renderFieldsets(), to the response,
+    # setting up each group just before it is rendered. See stream()
+    streaming = False
+
+    fieldsetTemplate = ViewPageTemplateFile("fieldset.pt")
+
+    def renderFieldset(self, group=None):
+        """Render the default fieldset, or the given group, with the
+        ``fieldset`` macro of the ``index`` template, or the default one of
+        ``fieldsetTemplate`` if it has none. Used in streaming mode. The macro
+        gets ``group`` and its ``widgets``.
+        """
+        macro = None
+        macros = getattr(getattr(self, "index", None), "macros", None)
+        if macros is not None:
+            try:
+                macro = macros["fieldset"]
+            except KeyError:
+                pass
+        if macro is None:
+            macro = self.fieldsetTemplate.macros["fieldset"]
+        return self.fieldsetTemplate(
+            group=group,
+            widgets=self.widgets if group is None else group.widgets,
+            macro=macro,
+        )
+
+    def renderFieldsets(self):
+        """Render all fieldsets with renderFieldset(). Templates of views in
+        streaming mode call this to place the fieldsets in the page, and the
+        fieldsets are streamed from there.
+        """
+        if self._streamMarker is not None:
+            return self._streamMarker
+        return "".join(self.stream())
+
+    def stream(self):
+        """Yield the rendered default fieldset and then each group in the
+        order of ``groups``. Groups are only set up right before they are
+        rendered, so the first chunk is ready before all widgets are.
+        """
+        if self.w is not None:
+            yield self.renderFieldset()
+            for group in self.groups:
+                yield self.renderFieldset(group)
+            return
+
+        z2.switch_on(self)
+        if not self._fieldsUpdated:
+            self.updateFieldsFromSchemata()
+            self._fieldsUpdated = True
+        for group in self._updateWidgets():
+            yield self.renderFieldset(group)
+
+    def displayValues(self):
+        """Return a list of DisplayValue records for the fields of the default
+        fieldset and then of each group, as they would be shown by the view.
+        The fields are set up as usual, including omitted fields, modes and
+        permissions, but no widgets are updated or rendered: values are read
+        directly from the content and converted with the data converter of
+        the display widget of each field. Fields in hidden mode are left out.
+        """
+        if self.w is None and not self._fieldsUpdated:
+            self.updateFieldsFromSchemata()
+            self._fieldsUpdated = True
+
+        content = None if self.ignoreContext else self.getContent()
+        fieldsets = [(None, self.fields)]
+        for idx, group in enumerate(self.groups):
+            fieldsets.append((getattr(group, "__name__", str(idx)), group.fields))
+
+        records = []
+        for fieldset, fields in fieldsets:
+            for name, formField in fields.items():
+                if formField.mode == HIDDEN_MODE:
+                    continue
+                schemaField = formField.field
+                value = None
+                if content is not None:
+                    dm = queryMultiAdapter((content, schemaField), IDataManager)
+                    if dm is not None and dm.canAccess():
+                        value = dm.query()
+                records.append(
+                    DisplayValue(
+                        fieldset,
+                        name,
+                        _translate(schemaField.title, self.request),
+                        _displayValue(
+                            formField,
+                            formField.mode or self.mode,
+                            content,
+                            value,
+                            self.request,
+                        ),
+                    )
+                )
+        return records
+
     # Helper methods
 
+    _fieldsUpdated = False
+    _streamUpdate = False
+    _streamMarker = None
+
     def __call__(self):
         # support subclassed forms which do not call update on their superclass
+        if self.streaming:
+            # update() only sets up the fields, stream() sets up the widgets
+            self._streamUpdate = True
+            try:
+                self._update()
+                self.update()
+            finally:
+                del self._streamUpdate
+            return self._write(self._streamPage())
         self._update()
         self.update()
         return self.render()
 
+    def _streamPage(self):
+        # The page is rendered before any widget is set up, with a marker
+        # where the fieldsets go
+        self._streamMarker = marker = "<!-- plone.autoform fieldsets %x -->" % id(self)
+        try:
+            page = self.render()
+        finally:
+            del self._streamMarker
+        head, found, tail = page.partition(marker)
+        yield head
+        if found:
+            yield from self.stream()
+            yield tail
+
+    def _write(self, chunks):
+        # Written while the request is still open, so widgets may access the
+        # database and check permissions. How soon the chunks reach the client
+        # depends on the publisher and server.
+        response = self.request.response
+        if not response.getHeader("Content-Type"):
+            response.setHeader("Content-Type", "text/html; charset=utf-8")
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            response.write(chunk)
+        return ""
+
     def _update(self):
         if self.w is not None:
             return
 
         z2.switch_on(self)
-        self.updateFieldsFromSchemata()
+        if not self._fieldsUpdated:
+            self.updateFieldsFromSchemata()
+            self._fieldsUpdated = True
+
+        if self._streamUpdate:
+            return
+
+        if self.lazyWidgets and (
+            getattr(type(self), "updateWidgets", None) is WidgetsView.updateWidgets
+        ):
+            self.w = _LazyWidgets(self)
+            self.fieldsets = _LazyFieldsets(self.w)
+            self.groups = _LazyGroups(self.w)
+            return
+
+        for group in self._updateWidgets():
+            pass
+
+    def _updateWidgets(self):
+        """Set up the widgets of the default fieldset and then of each group,
+        yielding None and then each group once its widgets are set up.
+        """
         self.updateWidgets()
 
         # shortcut 'widget' dictionary for all fieldsets
@@ -55,6 +480,7 @@ class WidgetsView(AutoFields, DisplayForm):
 
         groups = []
         self.fieldsets = {}
+        yield None
 
         for idx, groupFactory in enumerate(self.groups):
             group = groupFactory(self.context, self.request, self)
@@ -67,5 +493,101 @@ class WidgetsView(AutoFields, DisplayForm):
 
             group_name = getattr(group, "__name__", str(idx))
             self.fieldsets[group_name] = group
+            yield group
 
         self.groups = tuple(groups)
+
+
+# Maximum number of view classes created for batches
+BATCH_VIEW_CLASSES_SIZE = 1000
+
+# viewClass, id(schema), ids of additionalSchemata => subclass of viewClass.
+# Schemata are compared by identity, as different schemata may be equal,
+# e.g. those of unnamed models. The subclass keeps them, so the ids are not
+# reused while it is cached.
+_batchViewClasses = {}
+
+
+def _batchViewClass(viewClass, schema, additionalSchemata):
+    # One subclass per combination, so that the layout cached for it is
+    # shared by all batches
+    key = (viewClass, id(schema), tuple(id(s) for s in additionalSchemata))
+    batchViewClass = _batchViewClasses.get(key)
+    if batchViewClass is None:
+        batchViewClass = type(
+            viewClass.__name__,
+            (viewClass,),
+            {"schema": schema, "additionalSchemata": additionalSchemata},
+        )
+        if len(_batchViewClasses) >= BATCH_VIEW_CLASSES_SIZE:
+            _batchViewClasses.clear()
+        _batchViewClasses[key] = batchViewClass
+    return batchViewClass
+
+
+class WidgetsViewBatch:
+    """Display widgets for many objects with the same schemata, e.g. for the
+    rows of a table::
+
+        batch = WidgetsViewBatch(request, IDocument, viewClass=RowView)
+        for html in batch.render(documents):
+            ...
+
+    Each object gets its own view of viewClass, which is updated as usual.
+    The layout is only computed once as long as the outcome of the permission
+    checks is the same, and the widget factory of each field is looked up
+    once for all objects.
+    """
+
+    def __init__(self, request, schema=None, additionalSchemata=(), viewClass=None):
+        if viewClass is None:
+            viewClass = WidgetsView
+        if schema is not None:
+            viewClass = _batchViewClass(viewClass, schema, tuple(additionalSchemata))
+        self.viewClass = viewClass
+        self.request = request
+        # id(field), mode => (field, widget factory)
+        self._factories = {}
+
+    def views(self, contexts):
+        """Yield an updated view for each of the contexts"""
+        for context in contexts:
+            view = self.viewClass(context, self.request)
+            originals = view._initial_fields()
+            view.updateFieldsFromSchemata()
+            view._fieldsUpdated = True
+            self._setWidgetFactories(view, view.fields, originals)
+            for group in view.groups:
+                self._setWidgetFactories(view, group.fields, originals)
+            view.update()
+            yield view
+
+    def render(self, contexts):
+        """Yield the rendered view for each of the contexts"""
+        for view in self.views(contexts):
+            yield view.render()
+
+    def _setWidgetFactories(self, view, fields, originals):
+        # Fields created from the schemata are copies made for this view, so
+        # setting the factory does not change the cached layout. Those given
+        # by the view class are shared and left alone.
+        for formField in fields.values():
+            if formField in originals:
+                continue
+            mode = formField.mode or view.mode
+            if formField.widgetFactory.get(mode) is not None:
+                continue
+            factory = self._widgetFactory(formField.field, mode)
+            if factory is not None:
+                formField.widgetFactory[mode] = factory
+
+    def _widgetFactory(self, field, mode):
+        key = (id(field), mode)
+        cached = self._factories.get(key)
+        if cached is None:
+            factory = getSiteManager().adapters.lookup(
+                (providedBy(field), providedBy(self.request)), IFieldWidget
+            )
+            # keep the field, so that its id is not reused
+            cached = self._factories[key] = (field, factory)
+        return cached[1]
@@ -0,0 +1,150 @@
+"""Resolve widget factories and set up form layouts ahead of time, e.g. when
+the application starts or before worker processes are forked, instead of on
+the first request which renders a form.
+"""
+
+from plone.autoform import base
+from plone.autoform.base import AutoFields
+from plone.autoform.interfaces import IFormFieldProvider
+from plone.autoform.interfaces import WIDGETS_KEY
+from plone.autoform.utils import _dottedCache
+from plone.autoform.utils import resolveDottedName
+from plone.autoform.widgets import ParameterizedWidget
+from zope.component import getSiteManager
+from zope.interface.interfaces import IInterface
+from zope.publisher.browser import TestRequest
+
+import logging
+import plone.supermodel
+
+logger = logging.getLogger(__name__)
+
+
+def formSchemata():
+    """All schemata which are registered as form field providers (directly
+    or as the interface of a registered behavior), and all schemata of models
+    loaded from files by plone.supermodel.
+    """
+    schemata = {}
+    for registration in getSiteManager().registeredUtilities():
+        component = registration.component
+        for candidate in (component, getattr(component, "interface", None)):
+            if IInterface.providedBy(candidate) and IFormFieldProvider.providedBy(
+                candidate
+            ):
+                schemata[candidate] = None
+    for model in getattr(plone.supermodel, "_model_cache", {}).values():
+        for schema in model.schemata.values():
+            schemata[schema] = None
+    return list(schemata)
+
+
+def prewarmWidgets(schemata=None):
+    """Resolve the widget factories set for the fields of the given schemata
+    and their bases, or of all formSchemata() if not given. Widgets given as
+    dotted names are resolved into the cache of resolveDottedName(), so that
+    they do not need to be imported when a form is set up. Returns the number
+    of widget factories resolved.
+    """
+    if schemata is None:
+        schemata = formSchemata()
+    count = 0
+    seen = set()
+    for schema in schemata:
+        for iface in schema.__iro__:
+            if iface in seen:
+                continue
+            seen.add(iface)
+            widgets = iface.queryDirectTaggedValue(WIDGETS_KEY)
+            if not widgets:
+                continue
+            for name, widget in list(widgets.items()):
+                try:
+                    if isinstance(widget, str):
+                        if widget not in _dottedCache:
+                            resolveDottedName(widget)
+                            count += 1
+                    elif isinstance(widget, ParameterizedWidget):
+                        widget._compile()
+                        count += 1
+                except (AttributeError, ImportError, TypeError, ValueError):
+                    # reported again when the widget is used
+                    logger.warning(
+                        "Cannot resolve widget %r for field %s of %s",
+                        widget,
+                        name,
+                        iface.__identifier__,
+                        exc_info=True,
+                    )
+    return count
+
+
+def formClasses():
+    """All autoform form classes registered as adapters (browser views),
+    including those wrapped by plone.z3cform's layout.wrap_form().
+    """
+    classes = {}
+    for registration in getSiteManager().registeredAdapters():
+        factory = registration.factory
+        for candidate in (factory, getattr(factory, "form", None)):
+            if isinstance(candidate, type) and issubclass(candidate, AutoFields):
+                classes[candidate] = None
+    return list(classes)
+
+
+def _layoutCount():
+    return sum(len(entry.plans) for entry in list(base._layout_cache.values()))
+
+
+def warmUp(forms=None, schemata=None, context=None, request=None):
+    """Resolve widget factories and set up the fields of forms once, so that
+    merged tagged values, field templates and form layouts are cached.
+
+    forms are form classes or instances, by default all formClasses().
+    Classes are instantiated with context and request (a request without a
+    user by default, which skips permission checks). schemata are passed to
+    prewarmWidgets() together with the schemata of the forms.
+
+    Returns a dict with the number of schemata, widget factories resolved,
+    forms set up, forms which could not be set up, and new cached layouts.
+    """
+    if forms is None:
+        forms = formClasses()
+    if schemata is None:
+        schemata = formSchemata()
+    schemata = dict.fromkeys(schemata)
+    layouts = _layoutCount()
+
+    report = {"schemata": 0, "widgets": 0, "forms": 0, "failed": 0, "layouts": 0}
+    instances = []
+    for form in forms:
+        try:
+            if isinstance(form, type):
+                form = form(context, request if request is not None else TestRequest())
+            schemata.update(dict.fromkeys(form._schemata()))
+        except Exception:
+            # forms which need a real context or request
+            logger.debug("Cannot warm up %r", form, exc_info=True)
+            report["failed"] += 1
+        else:
+            instances.append(form)
+
+    report["schemata"] = len(schemata)
+    report["widgets"] = prewarmWidgets(schemata)
+
+    for form in instances:
+        try:
+            form.updateFieldsFromSchemata()
+        except Exception:
+            logger.debug("Cannot warm up %r", form, exc_info=True)
+            report["failed"] += 1
+        else:
+            report["forms"] += 1
+
+    report["layouts"] = max(_layoutCount() - layouts, 0)
+    logger.info(
+        "Warmed up %(forms)d forms (%(failed)d failed), %(schemata)d schemata, "
+        "%(widgets)d widgets, %(layouts)d layouts",
+        report,
+    )
+    return report
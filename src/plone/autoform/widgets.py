@@ -11,14 +11,44 @@ from z3c.form.interfaces import IWidget
 from z3c.form.widget import FieldWidget
 from zope.component import getMultiAdapter
 from zope.component import getSiteManager
-from zope.component import queryUtility
 from zope.interface import implementer
 from zope.interface import providedBy
 from zope.schema import getFields
 
+import weakref
 import z3c.form.browser.interfaces
 
 
+def _defaultFieldWidget(field, request):
+    return getMultiAdapter((field, request), IFieldWidget)
+
+
+class _TracebackInfo:
+    """__traceback_info__ for ParameterizedWidget, only formatted when it is
+    actually shown in a traceback.
+    """
+
+    def __init__(self, widget, field, steps):
+        self.widget = widget
+        self.field = field
+        self.steps = steps
+
+    def __str__(self):
+        return (
+            "{}, processing:\n"
+            '- field "{}"\n'
+            "- widget: {}\n"
+            "- params: {}\n"
+            "{}".format(
+                self.widget.__class__.__name__,
+                getattr(self.field, "__name__", None),
+                repr(self.widget.widget_factory),
+                self.widget.params,
+                self.steps,
+            )
+        )
+
+
 @implementer(IParameterizedWidget)
 class ParameterizedWidget:
     """A factory for deferred construction of widgets with parameters.
@@ -40,50 +70,76 @@ class ParameterizedWidget:
     Those all use ParameterizedWidget internally.
     """
 
+    # There is one instance per parameterized field of every schema
+    __slots__ = ("widget_factory", "params", "_compiled", "__weakref__")
+
     def __init__(self, widget_factory=None, **params):
         if widget_factory is not None:
             if (
-                not IFieldWidget.implementedBy(widget_factory)
+                not isinstance(widget_factory, str)
+                and not IFieldWidget.implementedBy(widget_factory)
                 and not IWidget.implementedBy(widget_factory)
-                and not isinstance(widget_factory, str)
             ):
                 raise TypeError(
                     "widget_factory must be an IFieldWidget " "or an IWidget"
                 )
         self.widget_factory = widget_factory
         self.params = params
+        # (widget_factory, callable creating the widget, description), see
+        # _compile()
+        self._compiled = None
 
     def __call__(self, field, request):
-        __traceback_info__ = (
-            "{}, processing:\n"
-            '- field "{}"\n'
-            "- widget: {}\n"
-            "- params: {}\n".format(
-                self.__class__.__name__,
-                field.__name__,
-                repr(self.widget_factory),
-                self.params,
-            )
-        )
-        if isinstance(self.widget_factory, str):
-            __traceback_info__ += "- resolving dotted name\n"
-            self.widget_factory = resolveDottedName(self.widget_factory)
-        if self.widget_factory is None:
-            # use default widget factory for this field type
-            __traceback_info__ += "- using default widget factory\n"
-            widget = getMultiAdapter((field, request), IFieldWidget)
-        elif IWidget.implementedBy(self.widget_factory):
-            __traceback_info__ += (
-                "- calling factory, then wrapping with " "FieldWidget\n"
-            )
-            widget = FieldWidget(field, self.widget_factory(request))
-        elif IFieldWidget.implementedBy(self.widget_factory):
-            __traceback_info__ += "- calling factory\n"
-            widget = self.widget_factory(field, request)
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not self.widget_factory:
+            compiled = self._compile()
+        __traceback_info__ = _TracebackInfo(self, field, compiled[2])  # noqa: F841
+        widget = compiled[1](field, request)
         for k, v in self.params.items():
             setattr(widget, k, v)
         return widget
 
+    def _compile(self):
+        """Resolve the widget factory once and turn it into a callable
+        taking field and request. The result is only ever replaced as a
+        whole, so concurrent calls at worst compile twice.
+        """
+        widget_factory = factory = self.widget_factory
+        steps = ""
+        __traceback_info__ = _TracebackInfo(self, None, "- compiling\n")  # noqa: F841
+        if isinstance(factory, str):
+            steps += "- resolving dotted name\n"
+            factory = resolveDottedName(factory)
+        if factory is None:
+            # use default widget factory for this field type
+            steps += "- using default widget factory\n"
+            create = _defaultFieldWidget
+        elif IWidget.implementedBy(factory):
+            steps += "- calling factory, then wrapping with FieldWidget\n"
+
+            def create(field, request):
+                return FieldWidget(field, factory(request))
+
+        elif IFieldWidget.implementedBy(factory):
+            steps += "- calling factory\n"
+            create = factory
+        else:
+            raise TypeError(f"{factory!r} is not an IFieldWidget or an IWidget")
+        compiled = self._compiled = (widget_factory, create, steps)
+        return compiled
+
+    def __getstate__(self):
+        state = dict(getattr(self, "__dict__", ()))
+        state["widget_factory"] = self.widget_factory
+        state["params"] = self.params
+        return state
+
+    def __setstate__(self, state):
+        self._compiled = None
+        for name, value in state.items():
+            if name != "_compiled":
+                setattr(self, name, value)
+
     def __repr__(self):
         return "{}({}, {})".format(
             self.__class__.__name__, self.widget_factory, self.params
@@ -104,11 +160,21 @@ class ParameterizedWidget:
     def getExportImportHandler(self, field):
         """Returns an IWidgetExportImportHandler suitable for this widget."""
         widgetName = self.getWidgetFactoryName()
+        sm = getSiteManager()
+        try:
+            handlers = _handlers[sm]
+        except KeyError:
+            handlers = _handlers.setdefault(sm, {})
+        key = (widgetName, providedBy(field) if widgetName is None else None)
+        try:
+            return handlers[key]
+        except KeyError:
+            pass
+
         if widgetName is None:
             # Find default widget factory for this field.
             # We use lookup instead of getAdapter b/c we don't want to
             # instantiate the widget.
-            sm = getSiteManager()
             widgetFactory = sm.adapters.lookup(
                 (providedBy(field), IFormLayer), IFieldWidget
             )
@@ -119,22 +185,52 @@ class ParameterizedWidget:
             else:
                 widgetName = ""
 
-        widgetHandler = queryUtility(IWidgetExportImportHandler, name=widgetName)
+        widgetHandler = sm.queryUtility(IWidgetExportImportHandler, name=widgetName)
         if widgetHandler is None:
-            widgetHandler = WidgetExportImportHandler(IHTMLFormElement)
+            widgetHandler = DefaultWidgetExportImportHandler
+        handlers[key] = widgetHandler
         return widgetHandler
 
 
+# site manager => {(widget name, field spec): IWidgetExportImportHandler}
+_handlers = weakref.WeakKeyDictionary()
+
+
+def widgetRegistrationChanged(event):
+    """Drop the cached export/import handlers when widgets or their
+    handlers are (un)registered
+    """
+    provided = getattr(event.object, "provided", None)
+    if provided is not None and (
+        provided.isOrExtends(IWidgetExportImportHandler)
+        or provided.isOrExtends(IFieldWidget)
+    ):
+        _handlers.clear()
+
+
+try:
+    from zope.testing.cleanup import addCleanUp
+except ImportError:  # pragma: no cover
+    pass
+else:
+    addCleanUp(_handlers.clear)
+
+
 @implementer(IWidgetExportImportHandler)
 class WidgetExportImportHandler:
     def __init__(self, widget_schema):
         self.fieldAttributes = getFields(widget_schema)
 
     def read(self, widgetNode, params):
-        for attributeName, attributeField in self.fieldAttributes.items():
-            for node in widgetNode.iterchildren():
-                if noNS(node.tag) == attributeName:
-                    params[attributeName] = elementToValue(attributeField, node)
+        fieldAttributes = self.fieldAttributes
+        for node in widgetNode.iterchildren():
+            if not isinstance(node.tag, str):
+                # comments and processing instructions
+                continue
+            attributeName = noNS(node.tag)
+            attributeField = fieldAttributes.get(attributeName)
+            if attributeField is not None:
+                params[attributeName] = elementToValue(attributeField, node)
 
     def write(self, widgetNode, params):
         for attributeName, attributeField in self.fieldAttributes.items():
@@ -145,6 +241,9 @@ class WidgetExportImportHandler:
                 widgetNode.append(child)
 
 
+# for widgets without a handler of their own
+DefaultWidgetExportImportHandler = WidgetExportImportHandler(IHTMLFormElement)
+
 TextInputWidgetExportImportHandler = WidgetExportImportHandler(
     z3c.form.browser.interfaces.IHTMLTextInputWidget
 )